@@ -42,6 +42,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'tickets.middleware.PrecompressedStaticMiddleware',
+    'tickets.middleware.PerformanceMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -117,7 +119,99 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# collectstatic fingerprints files by content hash and writes .gz/.br variants.
+# Deploys must run `manage.py collectstatic`; without it URLs are unhashed.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'tickets.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Cache lifetime for fingerprinted static files (tickets.middleware.PrecompressedStaticMiddleware)
+STATIC_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Request performance instrumentation (tickets.middleware.PerformanceMiddleware)
+
+PERF_QUERY_BUDGET = 20
+
+PERF_LATENCY_BUDGET_MS = 500
+
+# Fraction of requests whose individual queries are logged
+PERF_TRACE_SAMPLE_RATE = 0.01
+
+# Clients allowed to scrape /metrics/ (empty list allows everyone)
+PERF_METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Booking confirmation outbox (tickets.outbox, manage.py dispatch_outbox)
+
+DEFAULT_FROM_EMAIL = 'CHAN 2024 Tickets <tickets@chan2024.example>'
+
+SMS_BACKEND = 'tickets.sms.ConsoleBackend'
+
+OUTBOX_BATCH_SIZE = 200
+
+OUTBOX_MAX_ATTEMPTS = 5
+
+OUTBOX_RETRY_BACKOFF_SECONDS = 30
+
+OUTBOX_RETRY_BACKOFF_MAX_SECONDS = 3600
+
+# How long a claimed batch is hidden from other dispatchers
+OUTBOX_LEASE_SECONDS = 300
+
+# Booking form idempotency keys are purged after this long (manage.py purge_idempotency_keys)
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+
+# Group standings page data is cached until a result changes, at most this long
+STANDINGS_CACHE_SECONDS = 300
+
+# Demand-based pricing (tickets.pricing, manage.py reprice_tickets)
+
+PRICING_WINDOW_HOURS = 24
+
+# (minimum tickets sold per hour, multiplier applied to the base price)
+PRICING_TIERS = [
+    (0, '0.90'),
+    (2, '1.00'),
+    (10, '1.15'),
+    (30, '1.30'),
+]
+
+PRICE_SNAPSHOT_CACHE_SECONDS = 60
+
+# Waitlist for sold-out categories (tickets.waitlist, manage.py allocate_waitlist)
+
+# Share of released seats offered to the waitlist; the rest return to general sale
+WAITLIST_SHARE = 0.5
+
+# How long an offer holds its seats
+WAITLIST_CLAIM_MINUTES = 30
+
+# Waiting entries considered per price row per allocation run
+WAITLIST_BATCH_SIZE = 100
+
+# Base URL for links in outgoing messages
+SITE_URL = 'http://localhost:8000'
+
+# "Find my booking" (tickets.lookup)
+
+# Secret for the hashed contact keys on Booking; defaults to SECRET_KEY.
+# Changing it requires recomputing the keys (migration 0008 backfill).
+CONTACT_KEY_SECRET = None
+
+BOOKING_LOOKUP_CACHE_SECONDS = 60
+
+# Lookup attempts allowed per client IP per window
+BOOKING_LOOKUP_MAX_ATTEMPTS = 10
+
+BOOKING_LOOKUP_WINDOW_SECONDS = 600
@@ -154,6 +154,9 @@ def populate_ticket_prices():
                     'price_kes': Decimal(str(base_prices[cat_name]['KES'])),
                     'price_ugx': Decimal(str(base_prices[cat_name]['UGX'])),
                     'price_tzs': Decimal(str(base_prices[cat_name]['TZS'])),
+                    'base_price_kes': Decimal(str(base_prices[cat_name]['KES'])),
+                    'base_price_ugx': Decimal(str(base_prices[cat_name]['UGX'])),
+                    'base_price_tzs': Decimal(str(base_prices[cat_name]['TZS'])),
                     'available_quantity': 1000 if cat_name == 'Regular' else 200,
                 }
             )
@@ -1,5 +1,13 @@
+import json
+
 from django.contrib import admin
-from .models import Team, Venue, Match, TicketCategory, TicketPrice, Booking, Ticket
+from django.utils.html import format_html
+from django.utils import timezone
+from .models import Team, Venue, Match, TicketCategory, TicketPrice, Booking, Ticket, OutboxMessage, Standing, TicketPriceHistory, ArchivedBooking, WaitlistEntry
+from .pricing import CURRENCIES, invalidate_price_snapshots
+from .archive import decode_payload
+from .forms import BookingAdminForm
+from .lookup import contact_lookup
 
 @admin.register(Team)
 class TeamAdmin(admin.ModelAdmin):
@@ -14,11 +22,19 @@ class VenueAdmin(admin.ModelAdmin):
 
 @admin.register(Match)
 class MatchAdmin(admin.ModelAdmin):
-    list_display = ['home_team', 'away_team', 'venue', 'date_time', 'group', 'match_type', 'is_completed']
+    list_display = ['home_team', 'away_team', 'venue', 'date_time', 'group', 'match_type', 'home_score', 'away_score', 'is_completed']
     list_filter = ['group', 'match_type', 'is_completed', 'venue']
     search_fields = ['home_team__name', 'away_team__name']
     date_hierarchy = 'date_time'
 
+@admin.register(Standing)
+class StandingAdmin(admin.ModelAdmin):
+    list_display = ['team', 'group', 'played', 'won', 'drawn', 'lost', 'goals_for', 'goals_against', 'goal_difference', 'points']
+    list_filter = ['group']
+    ordering = ['group', '-points', '-goal_difference', '-goals_for', 'team__name']
+    # Maintained from match results; use manage.py rebuild_standings to recompute
+    readonly_fields = list_display
+
 @admin.register(TicketCategory)
 class TicketCategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'description']
@@ -29,9 +45,33 @@ class TicketPriceInline(admin.TabularInline):
 
 @admin.register(TicketPrice)
 class TicketPriceAdmin(admin.ModelAdmin):
-    list_display = ['match', 'category', 'price_kes', 'price_ugx', 'price_tzs', 'available_quantity']
+    list_display = ['match', 'category', 'price_kes', 'price_ugx', 'price_tzs', 'available_quantity', 'held_quantity', 'released_quantity']
     list_filter = ['category', 'match__group']
     search_fields = ['match__home_team__name', 'match__away_team__name', 'category__name']
+    # Maintained by the waitlist allocator
+    readonly_fields = ['held_quantity', 'released_quantity']
+    
+    def save_model(self, request, obj, form, change):
+        # A hand-set price becomes the base the pricing engine scales from,
+        # otherwise the next reprice_tickets run would overwrite it
+        for currency in CURRENCIES:
+            if f'price_{currency}' in form.changed_data and f'base_price_{currency}' not in form.changed_data:
+                setattr(obj, f'base_price_{currency}', getattr(obj, f'price_{currency}'))
+        super().save_model(request, obj, form, change)
+        invalidate_price_snapshots([obj.match_id])
+
+@admin.register(TicketPriceHistory)
+class TicketPriceHistoryAdmin(admin.ModelAdmin):
+    list_display = ['ticket_price', 'changed_at', 'sales_velocity', 'multiplier', 'old_price_kes', 'new_price_kes']
+    list_filter = ['multiplier']
+    date_hierarchy = 'changed_at'
+    list_select_related = ['ticket_price__match__home_team', 'ticket_price__match__away_team', 'ticket_price__category']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
 
 class TicketInline(admin.TabularInline):
     model = Ticket
@@ -40,11 +80,43 @@ class TicketInline(admin.TabularInline):
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
+    form = BookingAdminForm
     list_display = ['booking_reference', 'customer_name', 'ticket_price', 'quantity', 'total_amount', 'currency', 'payment_status', 'created_at']
     list_filter = ['payment_status', 'currency', 'payment_method', 'created_at']
-    search_fields = ['booking_reference', 'customer_name', 'customer_email']
+    search_fields = ['^customer_name']
+    search_help_text = 'Booking reference, exact email address or phone number, or the start of the customer name'
     readonly_fields = ['booking_reference', 'total_amount', 'created_at', 'updated_at']
     inlines = [TicketInline]
+    
+    def get_search_results(self, request, queryset, search_term):
+        # References and contact details use their indexes instead of a LIKE scan over every booking
+        term = search_term.strip()
+        field, key = contact_lookup(term)
+        if key:
+            return queryset.filter(**{field: key}), False
+        reference = term.upper()
+        if reference.isalnum() and queryset.filter(booking_reference=reference).exists():
+            return queryset.filter(booking_reference=reference), False
+        return super().get_search_results(request, queryset, search_term)
+
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(admin.ModelAdmin):
+    list_display = ['booking_reference', 'customer_name', 'ticket_price', 'created_at', 'archived_at']
+    search_fields = ['booking_reference', 'customer_name']
+    date_hierarchy = 'created_at'
+    list_select_related = ['ticket_price__match__home_team', 'ticket_price__match__away_team', 'ticket_price__category']
+    fields = ['booking_reference', 'original_id', 'ticket_price', 'customer_name', 'created_at', 'archived_at', 'archived_data']
+    readonly_fields = fields
+    
+    @admin.display(description='Booking and tickets')
+    def archived_data(self, obj):
+        return format_html('<pre>{}</pre>', json.dumps(decode_payload(obj.payload), indent=2))
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
 
 @admin.register(Ticket)
 class TicketAdmin(admin.ModelAdmin):
@@ -52,3 +124,25 @@ class TicketAdmin(admin.ModelAdmin):
     list_filter = ['is_used']
     search_fields = ['ticket_number', 'booking__booking_reference']
     readonly_fields = ['ticket_number']
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['recipient', 'channel', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'booking']
+    list_filter = ['channel', 'status']
+    search_fields = ['recipient', 'booking__booking_reference']
+    readonly_fields = ['created_at', 'sent_at', 'last_error']
+    raw_id_fields = ['booking']
+    actions = ['retry_now']
+
+    @admin.action(description='Retry selected messages now')
+    def retry_now(self, request, queryset):
+        queryset.exclude(status='sent').update(status='pending', attempts=0, next_attempt_at=timezone.now())
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ['customer_name', 'ticket_price', 'quantity', 'status', 'created_at', 'offer_expires_at', 'booking']
+    list_filter = ['status']
+    search_fields = ['customer_name', 'customer_email']
+    list_select_related = ['ticket_price__match__home_team', 'ticket_price__match__away_team', 'ticket_price__category', 'booking']
+    readonly_fields = ['token', 'status', 'created_at', 'offered_at', 'offer_expires_at', 'booking']
+    raw_id_fields = ['ticket_price']
@@ -0,0 +1,323 @@
+"""
+Read-only JSON API (v1) for the mobile apps.
+
+List endpoints support:
+    ?fields=a,b          sparse fieldset for the top-level objects
+    ?limit=n&cursor=c    cursor pagination (next cursor is in the response)
+Match endpoints also support:
+    ?expand=x,y          embed home_team, away_team, venue and/or prices
+    ?fields[team]=a,b    sparse fieldset for embedded objects of a type
+Responses carry an ETag and honour If-None-Match.
+
+Rows are built straight from .values() so no model instances are created;
+to-one expansions are joined into the same query and ?expand=prices costs
+one more.
+"""
+import base64
+import hashlib
+import json
+from datetime import datetime
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_GET
+
+from .models import Match, Team, TicketPrice, Venue
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+# Public field name -> ORM lookup, per resource type
+FIELDS = {
+    'match': {
+        'id': 'id',
+        'date_time': 'date_time',
+        'group': 'group',
+        'match_type': 'match_type',
+        'is_completed': 'is_completed',
+        'home_score': 'home_score',
+        'away_score': 'away_score',
+        'home_team': 'home_team_id',
+        'away_team': 'away_team_id',
+        'venue': 'venue_id',
+    },
+    'team': {
+        'id': 'id',
+        'name': 'name',
+        'code': 'code',
+        'flag_image': 'flag_image',
+    },
+    'venue': {
+        'id': 'id',
+        'name': 'name',
+        'city': 'city',
+        'country': 'country',
+        'capacity': 'capacity',
+    },
+    'price': {
+        'id': 'id',
+        'match': 'match_id',
+        'category': 'category__name',
+        'description': 'category__description',
+        'price_kes': 'price_kes',
+        'price_ugx': 'price_ugx',
+        'price_tzs': 'price_tzs',
+        'available_quantity': 'available_quantity',
+    },
+}
+
+# Expandable to-one relations: name -> (resource type, ORM path)
+MATCH_RELATIONS = {
+    'home_team': ('team', 'home_team'),
+    'away_team': ('team', 'away_team'),
+    'venue': ('venue', 'venue'),
+}
+
+
+class APIError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _split(value):
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+def _fieldset(request, resource, param=None):
+    """Public field names requested for a resource type (all by default)"""
+    available = FIELDS[resource]
+    value = request.GET.get(param or f'fields[{resource}]')
+    if not value:
+        return list(available)
+    fields = _split(value)
+    unknown = [f for f in fields if f not in available]
+    if unknown:
+        raise APIError(f"Unknown {resource} field(s): {', '.join(unknown)}")
+    return fields
+
+
+def _expand(request, allowed):
+    expand = _split(request.GET.get('expand', ''))
+    unknown = [e for e in expand if e not in allowed]
+    if unknown:
+        raise APIError(f"Cannot expand: {', '.join(unknown)}")
+    return expand
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise APIError('limit must be an integer')
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def _encode_cursor(values):
+    # Full isoformat: DjangoJSONEncoder drops sub-millisecond digits, which
+    # would repeat the last row on the next page
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise APIError('Invalid cursor')
+
+
+def _cursor_value(field, value):
+    """Check a decoded cursor value against its ordering field"""
+    if field == 'date_time':
+        if not isinstance(value, str):
+            raise APIError('Invalid cursor')
+        try:
+            value = parse_datetime(value)
+        except ValueError:
+            value = None
+        if value is None:
+            raise APIError('Invalid cursor')
+    elif field == 'id':
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise APIError('Invalid cursor')
+    return value
+
+
+def _paginate(request, queryset, ordering):
+    """
+    Keyset pagination over the ``ordering`` fields (the last must be unique).
+    Fetches limit + 1 rows so no COUNT query is needed.
+    """
+    cursor = request.GET.get('cursor')
+    if cursor:
+        values = _decode_cursor(cursor)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise APIError('Invalid cursor')
+        values = [_cursor_value(field, value) for field, value in zip(ordering, values)]
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+        condition = Q()
+        for i, field in enumerate(ordering):
+            step = Q(**{f'{field}__gt': values[i]})
+            for prev_field, prev_value in zip(ordering[:i], values[:i]):
+                step &= Q(**{prev_field: prev_value})
+            condition |= step
+        try:
+            queryset = queryset.filter(condition)
+        except (ValueError, TypeError):
+            raise APIError('Invalid cursor')
+
+    limit = _limit(request)
+    rows = list(queryset.order_by(*ordering)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor([rows[-1][field] for field in ordering])
+    return rows, next_cursor
+
+
+def _json_response(request, payload):
+    body = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    etag = '"%s"' % hashlib.md5(body, usedforsecurity=False).hexdigest()
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=30'
+    return response
+
+
+def api_view(view):
+    """GET only, with APIError rendered as a JSON error response"""
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except APIError as error:
+            return JsonResponse({'error': str(error)}, status=error.status)
+    return wrapper
+
+
+def _list(request, queryset, resource, ordering=('id',)):
+    """List endpoint for resources without expandable relations"""
+    fields = _fieldset(request, resource, 'fields')
+    columns = {name: FIELDS[resource][name] for name in fields}
+    queryset = queryset.values(*set(columns.values()) | set(ordering))
+    rows, next_cursor = _paginate(request, queryset, list(ordering))
+    data = [{name: row[column] for name, column in columns.items()} for row in rows]
+    return _json_response(request, {'data': data, 'next_cursor': next_cursor})
+
+
+def _match_columns(request):
+    """
+    Map each requested match field to its .values() column, or for an
+    expanded to-one relation to a {field: column} dict joined into the
+    same query.
+    """
+    fields = _fieldset(request, 'match', 'fields')
+    expand = _expand(request, list(MATCH_RELATIONS) + ['prices'])
+    columns = {}
+    for name in fields:
+        if name in MATCH_RELATIONS and name in expand:
+            resource, path = MATCH_RELATIONS[name]
+            columns[name] = {sub: f'{path}__{FIELDS[resource][sub]}' for sub in _fieldset(request, resource)}
+        else:
+            columns[name] = FIELDS['match'][name]
+    return columns, expand
+
+
+def _match_values(queryset, columns):
+    lookups = {'id', 'date_time'}
+    for column in columns.values():
+        lookups.update(column.values() if isinstance(column, dict) else [column])
+    return queryset.values(*lookups)
+
+
+def _serialize_matches(request, rows, columns, expand):
+    data = []
+    for row in rows:
+        item = {}
+        for name, column in columns.items():
+            if isinstance(column, dict):
+                item[name] = {sub: row[sub_column] for sub, sub_column in column.items()}
+            else:
+                item[name] = row[column]
+        data.append(item)
+
+    if 'prices' in expand:
+        # One extra query for the reverse relation, grouped in Python
+        price_columns = {name: FIELDS['price'][name] for name in _fieldset(request, 'price')}
+        prices = {}
+        queryset = TicketPrice.objects.filter(match_id__in=[row['id'] for row in rows]).order_by('id')
+        for price in queryset.values(*set(price_columns.values()) | {'match_id'}):
+            prices.setdefault(price['match_id'], []).append(
+                {name: price[column] for name, column in price_columns.items()}
+            )
+        for row, item in zip(rows, data):
+            item['prices'] = prices.get(row['id'], [])
+    return data
+
+
+@api_view
+def match_list(request):
+    """Matches ordered by kick-off; filter with ?group=, ?team=<code>, ?venue=<id>, ?is_completed="""
+    queryset = Match.objects.all()
+    if request.GET.get('group'):
+        queryset = queryset.filter(group=request.GET['group'])
+    if request.GET.get('team'):
+        team = request.GET['team']
+        queryset = queryset.filter(Q(home_team__code=team) | Q(away_team__code=team))
+    if request.GET.get('venue'):
+        try:
+            queryset = queryset.filter(venue_id=int(request.GET['venue']))
+        except ValueError:
+            raise APIError('venue must be an integer id')
+    if request.GET.get('is_completed') in ('true', 'false'):
+        queryset = queryset.filter(is_completed=request.GET['is_completed'] == 'true')
+
+    columns, expand = _match_columns(request)
+    rows, next_cursor = _paginate(request, _match_values(queryset, columns), ['date_time', 'id'])
+    data = _serialize_matches(request, rows, columns, expand)
+    return _json_response(request, {'data': data, 'next_cursor': next_cursor})
+
+
+@api_view
+def match_item(request, match_id):
+    """A single match; supports ?fields= and ?expand="""
+    columns, expand = _match_columns(request)
+    rows = list(_match_values(Match.objects.filter(id=match_id), columns))
+    if not rows:
+        raise APIError('Match not found', status=404)
+    data = _serialize_matches(request, rows, columns, expand)
+    return _json_response(request, {'data': data[0]})
+
+
+@api_view
+def team_list(request):
+    """All teams"""
+    return _list(request, Team.objects.all(), 'team')
+
+
+@api_view
+def venue_list(request):
+    """All venues"""
+    return _list(request, Venue.objects.all(), 'venue')
+
+
+@api_view
+def price_list(request):
+    """Ticket prices; filter with ?match=<id>"""
+    queryset = TicketPrice.objects.all()
+    if request.GET.get('match'):
+        try:
+            queryset = queryset.filter(match_id=int(request.GET['match']))
+        except ValueError:
+            raise APIError('match must be an integer id')
+    return _list(request, queryset, 'price')
@@ -0,0 +1,167 @@
+"""
+Archival of bookings (and their tickets) for completed matches.
+
+Each batch copies the rows into ArchivedBooking and deletes them from the
+hot tables in one transaction, so an interrupted run loses nothing and
+simply resumes with the next batch when restarted. load_booking() falls
+back to the archive so confirmation pages keep working.
+
+The payload holds only what the ArchivedBooking columns do not: values are
+stored positionally (PAYLOAD_BOOKING_FIELDS / PAYLOAD_TICKET_FIELDS), derived
+columns (contact keys, ticket ids and booking_id) are recomputed on restore,
+and the JSON is deflated with a preset dictionary, since rows this small
+barely compress on their own.
+"""
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connection, transaction
+
+from . import contact
+from .models import ArchivedBooking, Booking, Ticket
+
+# Stored as ArchivedBooking columns: id (as original_id), booking_reference,
+# ticket_price_id, customer_name, created_at
+PAYLOAD_BOOKING_FIELDS = [
+    'user_id', 'quantity', 'total_amount', 'currency', 'payment_method', 'payment_status',
+    'customer_email', 'customer_phone', 'updated_at',
+]
+PAYLOAD_TICKET_FIELDS = ['ticket_number', 'qr_code', 'is_used']
+
+BOOKING_FIELDS = ['id', 'booking_reference', 'ticket_price_id', 'customer_name', 'created_at'] + PAYLOAD_BOOKING_FIELDS
+TICKET_FIELDS = ['booking_id'] + PAYLOAD_TICKET_FIELDS
+
+# Preset deflate dictionary. Never change it: existing payloads need the
+# exact bytes to decompress.
+ZDICT = (
+    b'"pending""completed""failed""cancelled""UGX""KES""TZS""mpesa_ke""airtel_ke""mtn_ug""airtel_ug"'
+    b'"mpesa_tz""tigo_tz""visa""mastercard""amex"@gmail.com"@yahoo.com"@example.com"+2547+2567+2556'
+    b'07.00",".50","null,false]true],[[null,1,"2,"3,"4,"2024-2025-2026-T:00Z"0:00Z"'
+)
+
+
+def _encode(booking, tickets):
+    data = [
+        [booking[field] for field in PAYLOAD_BOOKING_FIELDS],
+        [[ticket[field] for field in PAYLOAD_TICKET_FIELDS] for ticket in tickets],
+    ]
+    raw = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, ZDICT)
+    return compressor.compress(raw) + compressor.flush()
+
+
+def decode_payload(payload):
+    """{'booking': {...}, 'tickets': [{...}]} with the fields the payload stores"""
+    decompressor = zlib.decompressobj(-15, ZDICT)
+    booking, tickets = json.loads(decompressor.decompress(bytes(payload)) + decompressor.flush())
+    return {
+        'booking': dict(zip(PAYLOAD_BOOKING_FIELDS, booking)),
+        'tickets': [dict(zip(PAYLOAD_TICKET_FIELDS, ticket)) for ticket in tickets],
+    }
+
+
+def archivable_bookings():
+    # Bookings with undelivered confirmations stay until the outbox is drained
+    return (
+        Booking.objects.filter(ticket_price__match__is_completed=True)
+        .exclude(outbox_messages__status='pending')
+    )
+
+
+def archive_batch(batch_size):
+    """Move one batch to the archive. Returns (bookings, tickets) moved."""
+    with transaction.atomic():
+        bookings = list(archivable_bookings().order_by('id').values(*BOOKING_FIELDS)[:batch_size])
+        if not bookings:
+            return 0, 0
+        ids = [b['id'] for b in bookings]
+
+        tickets = {}
+        ticket_count = 0
+        for ticket in Ticket.objects.filter(booking_id__in=ids).order_by('id').values(*TICKET_FIELDS):
+            tickets.setdefault(ticket['booking_id'], []).append(ticket)
+            ticket_count += 1
+
+        ArchivedBooking.objects.bulk_create([
+            ArchivedBooking(
+                original_id=b['id'],
+                booking_reference=b['booking_reference'],
+                ticket_price_id=b['ticket_price_id'],
+                customer_name=b['customer_name'],
+                created_at=b['created_at'],
+                payload=_encode(b, tickets.get(b['id'], [])),
+            )
+            for b in bookings
+        ])
+        Ticket.objects.filter(booking_id__in=ids).delete()
+        Booking.objects.filter(id__in=ids).delete()
+    return len(bookings), ticket_count
+
+
+def _restore(archived):
+    """Unsaved Booking and Ticket instances rebuilt from an archive row"""
+    data = decode_payload(archived.payload)
+    values = {
+        'id': archived.original_id,
+        'booking_reference': archived.booking_reference,
+        'ticket_price_id': archived.ticket_price_id,
+        'customer_name': archived.customer_name,
+        'created_at': archived.created_at,
+        **data['booking'],
+    }
+    booking = Booking(**{
+        f.attname: f.to_python(values[f.attname])
+        for f in Booking._meta.concrete_fields if f.attname in values
+    })
+    booking.email_key = contact.email_key(booking.customer_email)
+    booking.phone_key = contact.phone_key(booking.customer_phone)
+    tickets = []
+    for t in data['tickets']:
+        ticket = Ticket(**{f.attname: f.to_python(t[f.attname]) for f in Ticket._meta.concrete_fields if f.attname in t})
+        ticket.booking_id = booking.id
+        tickets.append(ticket)
+    return booking, tickets
+
+
+def load_booking(booking_id):
+    """(booking, tickets) from the hot tables or the archive, or (None, None)"""
+    booking = Booking.objects.filter(id=booking_id).first()
+    if booking is not None:
+        return booking, list(Ticket.objects.filter(booking=booking))
+    archived = ArchivedBooking.objects.filter(original_id=booking_id).first()
+    if archived is None:
+        return None, None
+    return _restore(archived)
+
+
+def relation_sizes(models):
+    """
+    {table: (rows, table_bytes, index_bytes)} for the given models. Sizes are
+    None where the database cannot report them.
+    """
+    sizes = {}
+    with connection.cursor() as cursor:
+        for model in models:
+            table = model._meta.db_table
+            cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+            rows = cursor.fetchone()[0]
+            table_bytes = index_bytes = None
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT pg_table_size(%s), pg_indexes_size(%s)', [table, table])
+                table_bytes, index_bytes = cursor.fetchone()
+            elif connection.vendor == 'sqlite':
+                try:
+                    cursor.execute('SELECT SUM(pgsize) FROM dbstat WHERE name = %s', [table])
+                    table_bytes = cursor.fetchone()[0] or 0
+                    cursor.execute(
+                        "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+                        "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s)",
+                        [table],
+                    )
+                    index_bytes = cursor.fetchone()[0] or 0
+                except DatabaseError:
+                    # SQLite built without the dbstat virtual table
+                    pass
+            sizes[table] = (rows, table_bytes, index_bytes)
+    return sizes
@@ -0,0 +1,48 @@
+"""
+Hashed contact keys for finding bookings by email address or phone number.
+
+Values are normalised (emails lowercased, phone numbers reduced to their
+last nine digits so +254 7.., 07.. and 7.. agree) and HMAC-SHA256 hashed with
+CONTACT_KEY_SECRET (default SECRET_KEY). The indexed keys support exact
+lookups without storing another plain copy of the contact details or
+scanning customer_email. Changing the secret requires re-running the
+backfill in migration 0008.
+"""
+import re
+
+from django.conf import settings
+from django.utils.crypto import salted_hmac
+
+PHONE_DIGITS = 9
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+def normalize_phone(phone):
+    digits = re.sub(r'\D', '', phone or '')
+    return digits[-PHONE_DIGITS:] if len(digits) >= PHONE_DIGITS else ''
+
+
+def _key(kind, value):
+    if not value:
+        return ''
+    secret = getattr(settings, 'CONTACT_KEY_SECRET', None) or settings.SECRET_KEY
+    return salted_hmac(f'tickets.contact.{kind}', value, secret=secret, algorithm='sha256').hexdigest()
+
+
+def email_key(email):
+    return _key('email', normalize_email(email))
+
+
+def phone_key(phone):
+    return _key('phone', normalize_phone(phone))
+
+
+def looks_like_email(value):
+    return '@' in value
+
+
+def looks_like_phone(value):
+    return bool(normalize_phone(value)) and not re.search(r'[A-Za-z]', value)
@@ -1,7 +1,14 @@
+import uuid
+
 from django import forms
-from .models import Booking, TicketPrice
+from .models import Booking, TicketPrice, WaitlistEntry
+from .contact import looks_like_email, looks_like_phone
+from .waitlist import SEAT_FIELDS, seat_changes
 
 class BookingForm(forms.ModelForm):
+    # A fresh key per rendered form; a resubmission of the same form carries the same key
+    idempotency_key = forms.UUIDField(required=False, initial=uuid.uuid4, widget=forms.HiddenInput)
+    
     class Meta:
         model = Booking
         fields = [
@@ -22,8 +29,11 @@ class BookingForm(forms.ModelForm):
         match = kwargs.pop('match', None)
         super().__init__(*args, **kwargs)
         
+        # Booking needs the match, teams and venue for the confirmation messages
+        ticket_prices = TicketPrice.objects.select_related('match__home_team', 'match__away_team', 'match__venue', 'category')
         if match:
-            self.fields['ticket_price'].queryset = TicketPrice.objects.filter(match=match)
+            ticket_prices = ticket_prices.filter(match=match)
+        self.fields['ticket_price'].queryset = ticket_prices
         
         # Update payment method choices based on currency
         self.fields['payment_method'].choices = [
@@ -49,3 +59,75 @@ class BookingForm(forms.ModelForm):
         
         return quantity
 
+
+class BookingAdminForm(forms.ModelForm):
+    class Meta:
+        model = Booking
+        fields = '__all__'
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        ticket_price = cleaned_data.get('ticket_price')
+        quantity = cleaned_data.get('quantity')
+        if not self.instance.pk or not ticket_price or not quantity:
+            return cleaned_data
+        # Reactivating a booking, raising its quantity or moving it to another
+        # category takes seats from general sale; refuse if they are not there
+        previous = {field: getattr(self.instance, field) for field in SEAT_FIELDS}
+        current = {'payment_status': cleaned_data.get('payment_status'), 'ticket_price_id': ticket_price.id, 'quantity': quantity}
+        released, taken = seat_changes(previous, current)
+        if taken:
+            # The admin saves in the same transaction, so the row stays locked until then
+            available = (
+                TicketPrice.objects.select_for_update().filter(id=ticket_price.id)
+                .values_list('available_quantity', flat=True).first()
+            )
+            if available < taken:
+                raise forms.ValidationError(
+                    f'This change needs {taken} more tickets but only {available} are left in this category.'
+                )
+        return cleaned_data
+
+
+class WaitlistJoinForm(forms.ModelForm):
+    class Meta:
+        model = WaitlistEntry
+        fields = ['quantity', 'customer_name', 'customer_email', 'customer_phone']
+        widgets = {
+            'quantity': forms.NumberInput(attrs={'class': 'form-control', 'min': '1', 'max': '10'}),
+            'customer_name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Full Name'}),
+            'customer_email': forms.EmailInput(attrs={'class': 'form-control', 'placeholder': 'Email Address'}),
+            'customer_phone': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Phone Number'}),
+        }
+    
+    def clean_quantity(self):
+        quantity = self.cleaned_data.get('quantity')
+        if quantity and quantity > 10:
+            raise forms.ValidationError('You can wait for at most 10 tickets.')
+        return quantity
+
+class WaitlistClaimForm(forms.Form):
+    currency = forms.ChoiceField(
+        choices=Booking._meta.get_field('currency').choices,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    payment_method = forms.ChoiceField(
+        choices=Booking.PAYMENT_METHOD_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+
+class FindBookingForm(forms.Form):
+    reference = forms.CharField(
+        max_length=20,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Booking Reference', 'autocomplete': 'off'}),
+    )
+    contact = forms.CharField(
+        max_length=254,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Email Address or Phone Number'}),
+    )
+    
+    def clean_contact(self):
+        contact = self.cleaned_data['contact'].strip()
+        if not (looks_like_email(contact) or looks_like_phone(contact)):
+            raise forms.ValidationError('Enter the email address or phone number used for the booking.')
+        return contact
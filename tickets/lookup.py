@@ -0,0 +1,99 @@
+"""
+Customer "find my booking": booking reference plus email address or phone.
+
+The reference hits its unique index and the contact detail is compared as
+its hashed key (tickets.contact), so a lookup is a single indexed query
+however large the bookings table grows. Bookings moved to the archive are
+found by reference and checked against the contact details in the payload.
+Results are cached briefly under a key built from the hashes only, and
+lookup_allowed() caps attempts per client to stop enumeration.
+
+The confirmation page shown after booking is addressed by the reference plus
+confirmation_token(), an HMAC of the reference, so its URL cannot be guessed
+from another booking's.
+"""
+import hashlib
+import hmac
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .archive import decode_payload
+from .contact import email_key, looks_like_email, looks_like_phone, phone_key
+from .models import ArchivedBooking, Booking
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def contact_lookup(value):
+    """(Booking field, key) for an email address or phone number, or (None, None)"""
+    value = (value or '').strip()
+    if looks_like_email(value):
+        return 'email_key', email_key(value)
+    if looks_like_phone(value):
+        return 'phone_key', phone_key(value)
+    return None, None
+
+
+def _archived_booking_id(reference, field, key):
+    archived = ArchivedBooking.objects.filter(booking_reference=reference).only('original_id', 'payload').first()
+    if archived is None:
+        return None
+    booking = decode_payload(archived.payload)['booking']
+    if field == 'email_key':
+        archived_key = email_key(booking.get('customer_email'))
+    else:
+        archived_key = phone_key(booking.get('customer_phone'))
+    return archived.original_id if archived_key and hmac.compare_digest(archived_key, key) else None
+
+
+def find_booking_id(reference, contact_value):
+    """ID of the (live or archived) booking matching both details, or None"""
+    reference = (reference or '').strip().upper()
+    field, key = contact_lookup(contact_value)
+    if not reference or not key:
+        return None
+
+    cache_key = 'tickets:lookup:' + hashlib.sha256(f'{reference}:{field}:{key}'.encode()).hexdigest()
+    booking_id = cache.get(cache_key)
+    if booking_id is not None:
+        return booking_id or None
+
+    booking_id = (
+        Booking.objects.filter(booking_reference=reference, **{field: key}).values_list('id', flat=True).first()
+        or _archived_booking_id(reference, field, key)
+    )
+    # Misses are cached as 0 so repeated guesses do not reach the database
+    cache.set(cache_key, booking_id or 0, _setting('BOOKING_LOOKUP_CACHE_SECONDS', 60))
+    return booking_id
+
+
+def confirmation_token(reference):
+    return salted_hmac('tickets.lookup.confirmation', reference, algorithm='sha256').hexdigest()[:32]
+
+
+def confirmed_booking_id(reference, token):
+    """ID of the (live or archived) booking with this reference if ``token`` is its confirmation token"""
+    if not constant_time_compare(token, confirmation_token(reference)):
+        return None
+    return (
+        Booking.objects.filter(booking_reference=reference).values_list('id', flat=True).first()
+        or ArchivedBooking.objects.filter(booking_reference=reference).values_list('original_id', flat=True).first()
+    )
+
+
+def lookup_allowed(client_ip):
+    """Count an attempt from ``client_ip``; False once it is over the limit for the window"""
+    key = f'tickets:lookup-attempts:{client_ip}'
+    window = _setting('BOOKING_LOOKUP_WINDOW_SECONDS', 600)
+    cache.add(key, 0, window)
+    try:
+        attempts = cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.set(key, 1, window)
+        attempts = 1
+    return attempts <= _setting('BOOKING_LOOKUP_MAX_ATTEMPTS', 10)
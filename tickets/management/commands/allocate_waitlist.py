@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tickets.waitlist import allocate, expire_offers
+
+
+class Command(BaseCommand):
+    help = 'Expire lapsed waitlist offers and offer released seats to the waitlist'
+
+    def handle(self, *args, **options):
+        expired, prices = expire_offers()
+        offers = allocate()
+        self.stdout.write(self.style.SUCCESS(
+            f'Expired {expired} offers on {prices} price rows, made {offers} new offers'
+        ))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from tickets.archive import archive_batch, relation_sizes
+from tickets.models import ArchivedBooking, Booking, Ticket
+
+
+class Command(BaseCommand):
+    help = 'Move bookings and tickets of completed matches into the compressed archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Bookings moved per transaction')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches (rerun to resume)')
+
+    def handle(self, *args, **options):
+        models = [Booking, Ticket, ArchivedBooking]
+        before = relation_sizes(models)
+
+        batches = bookings = tickets = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            moved_bookings, moved_tickets = archive_batch(options['batch_size'])
+            if not moved_bookings:
+                break
+            batches += 1
+            bookings += moved_bookings
+            tickets += moved_tickets
+            self.stdout.write(f'Batch {batches}: {moved_bookings} bookings, {moved_tickets} tickets')
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {bookings} bookings and {tickets} tickets in {batches} batches'))
+        self.report(before, relation_sizes(models))
+
+    def report(self, before, after):
+        def fmt(value):
+            return '-' if value is None else f'{value:,}'
+
+        self.stdout.write(f"{'table':<24}{'rows':>22}{'table bytes':>26}{'index bytes':>26}")
+        for table, (rows, table_bytes, index_bytes) in before.items():
+            rows_after, table_after, index_after = after[table]
+            self.stdout.write(
+                f'{table:<24}'
+                f'{fmt(rows) + " -> " + fmt(rows_after):>22}'
+                f'{fmt(table_bytes) + " -> " + fmt(table_after):>26}'
+                f'{fmt(index_bytes) + " -> " + fmt(index_after):>26}'
+            )
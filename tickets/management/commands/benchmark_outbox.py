@@ -0,0 +1,101 @@
+import socketserver
+import threading
+import time
+
+from django.core import mail
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from tickets import sms
+from tickets.models import OutboxMessage
+from tickets.outbox import dispatch_batch
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP server that accepts and discards every message"""
+
+    def handle(self):
+        self.wfile.write(b'220 sink\r\n')
+        in_data = False
+        for line in self.rfile:
+            if in_data:
+                if line == b'.\r\n':
+                    in_data = False
+                    self.wfile.write(b'250 ok\r\n')
+                continue
+            command = line[:4].upper()
+            if command in (b'EHLO', b'HELO'):
+                self.wfile.write(b'250 sink\r\n')
+            elif command == b'DATA':
+                in_data = True
+                self.wfile.write(b'354 go ahead\r\n')
+            elif command == b'QUIT':
+                self.wfile.write(b'221 bye\r\n')
+                return
+            else:
+                self.wfile.write(b'250 ok\r\n')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure outbox dispatch throughput with tickets.sms.LocmemBackend and either the in-memory email '
+        'backend or (--smtp-sink) a local SMTP server. Everything runs in one transaction that is rolled '
+        'back, so the database is left unchanged.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=10000, help='Messages to queue (half email, half SMS)')
+        parser.add_argument('--batch-size', type=int, default=None, help='Messages claimed per batch (default: OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--smtp-sink', action='store_true', help='Send email over SMTP to a local sink instead of keeping it in memory')
+
+    def handle(self, *args, **options):
+        email_settings = {'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend'}
+        sink = None
+        if options['smtp_sink']:
+            sink = SMTPSink(('127.0.0.1', 0), SMTPSinkHandler)
+            threading.Thread(target=sink.serve_forever, daemon=True).start()
+            email_settings = {
+                'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+                'EMAIL_HOST': '127.0.0.1',
+                'EMAIL_PORT': sink.server_address[1],
+                'EMAIL_USE_TLS': False,
+                'EMAIL_HOST_USER': '',
+            }
+        try:
+            self.run(options['messages'], options['batch_size'], email_settings)
+        finally:
+            if sink is not None:
+                sink.shutdown()
+
+    def run(self, total, batch_size, email_settings):
+        with override_settings(SMS_BACKEND='tickets.sms.LocmemBackend', **email_settings), transaction.atomic():
+            OutboxMessage.objects.bulk_create([
+                OutboxMessage(channel='email', recipient=f'bench{i}@example.com', subject='Benchmark', body='x' * 400)
+                if i % 2 else
+                OutboxMessage(channel='sms', recipient=f'+2547{i:08d}', body='x' * 120)
+                for i in range(total)
+            ], batch_size=1000)
+
+            sent = failed = 0
+            start = time.monotonic()
+            while True:
+                batch_sent, batch_failed = dispatch_batch(batch_size)
+                if not batch_sent and not batch_failed:
+                    break
+                sent += batch_sent
+                failed += batch_failed
+            elapsed = time.monotonic() - start
+
+            mail.outbox = []
+            sms.outbox.clear()
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Dispatched {sent} messages ({failed} failed attempts) in {elapsed:.2f}s '
+            f'({sent / elapsed if elapsed else 0:.0f} msg/s)'
+        ))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tickets.outbox import dispatch_batch
+
+
+class Command(BaseCommand):
+    help = 'Send pending booking confirmation emails and SMS from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Messages claimed per batch (default: OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new messages instead of exiting when the outbox is drained')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep between polls when idle with --loop')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        start = time.monotonic()
+        while True:
+            sent, failed = dispatch_batch(options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        elapsed = time.monotonic() - start
+        rate = total_sent / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Sent {total_sent} messages, {total_failed} failed attempts in {elapsed:.1f}s ({rate:.0f} msg/s)'
+        ))
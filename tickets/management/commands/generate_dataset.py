@@ -0,0 +1,291 @@
+import random
+import string
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from tickets.contact import email_key, phone_key
+from tickets.models import Booking, Match, Team, Ticket, TicketCategory, TicketPrice, Venue
+from tickets.standings import rebuild_standings
+from tickets.waitlist import ACTIVE_STATUSES
+
+BASE36 = string.digits + string.ascii_uppercase
+
+FIRST_NAMES = ['Amina', 'Brian', 'Chege', 'Diana', 'Esther', 'Faraji', 'Grace', 'Hassan', 'Imani', 'Joseph',
+               'Kato', 'Lulu', 'Moses', 'Nandi', 'Omondi', 'Pendo', 'Rehema', 'Salim', 'Tumaini', 'Wanjiru']
+LAST_NAMES = ['Achieng', 'Banda', 'Kamau', 'Mwangi', 'Nakato', 'Odhiambo', 'Okello', 'Otieno', 'Ssempa', 'Wafula']
+CITIES = [('Nairobi', 'Kenya'), ('Mombasa', 'Kenya'), ('Kampala', 'Uganda'), ('Entebbe', 'Uganda'),
+          ('Dar es Salaam', 'Tanzania'), ('Zanzibar', 'Tanzania'), ('Arusha', 'Tanzania'), ('Kisumu', 'Kenya')]
+
+CATEGORIES = [
+    ('VIP', 'Premium seating with exclusive amenities', {'KES': 1000, 'UGX': 15000, 'TZS': 25000}, 200),
+    ('Regular', 'Standard stadium seating', {'KES': 500, 'UGX': 7500, 'TZS': 12500}, 1000),
+    ('Student', 'Discounted tickets for students with valid ID', {'KES': 200, 'UGX': 3000, 'TZS': 5000}, 200),
+]
+
+# (value, weight) mixes
+CURRENCY_MIX = [('KES', 50), ('UGX', 25), ('TZS', 25)]
+PAYMENT_METHODS = {
+    'KES': [('mpesa_ke', 70), ('airtel_ke', 15), ('visa', 10), ('mastercard', 5)],
+    'UGX': [('mtn_ug', 55), ('airtel_ug', 30), ('visa', 10), ('amex', 5)],
+    'TZS': [('mpesa_tz', 50), ('tigo_tz', 35), ('visa', 10), ('mastercard', 5)],
+}
+STATUS_MIX = [('completed', 80), ('pending', 10), ('failed', 6), ('cancelled', 4)]
+QUANTITY_MIX = [(1, 35), (2, 35), (3, 12), (4, 12), (5, 3), (6, 3)]
+
+
+def base36(number, width):
+    digits = []
+    while number:
+        number, remainder = divmod(number, 36)
+        digits.append(BASE36[remainder])
+    return ''.join(reversed(digits)).rjust(width, '0')
+
+
+def chooser(rng, mix):
+    """Weighted choice function for a [(value, weight)] mix"""
+    values = [value for value, _ in mix]
+    cum_weights = []
+    total = 0
+    for _, weight in mix:
+        total += weight
+        cum_weights.append(total)
+    return lambda: rng.choices(values, cum_weights=cum_weights)[0]
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep generated values for auto_now/auto_now_add fields"""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field, _, _ in saved:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a seeded synthetic dataset of tournaments, matches, prices, bookings and tickets for '
+        'benchmarking. Booking references derive from --seed; use a new seed to add to a generated database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=2024)
+        parser.add_argument('--tournaments', type=int, default=10, help='Tournaments; all but the last are in the past and completed')
+        parser.add_argument('--matches-per-tournament', type=int, default=200)
+        parser.add_argument('--teams', type=int, default=200)
+        parser.add_argument('--venues', type=int, default=40)
+        parser.add_argument('--bookings', type=int, default=1_000_000)
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        if options['teams'] < 2 or options['venues'] < 1:
+            raise CommandError('Need at least 2 teams and 1 venue.')
+        if options['teams'] > 10 * 36 * 36:
+            raise CommandError(f'At most {10 * 36 * 36} generated teams are supported.')
+        self.rng = random.Random(options['seed'])
+        # Seed-derived prefix keeps references from different seeds apart
+        self.prefix = base36(options['seed'] % (36 * 36), 2)
+        self.batch_size = options['batch_size']
+        start = time.monotonic()
+
+        teams = self.generate_teams(options['teams'])
+        venues = self.generate_venues(options['venues'])
+        categories = self.generate_categories()
+        match_count = self.generate_matches(teams, venues, options['tournaments'], options['matches_per_tournament'])
+        prices = self.generate_prices(categories)
+        self.generate_bookings(prices, options['bookings'])
+        rebuild_standings()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {match_count} matches, {len(prices)} price rows and {options["bookings"]} bookings '
+            f'in {time.monotonic() - start:.0f}s'
+        ))
+
+    def generate_teams(self, count):
+        # Codes start with a digit so they never collide with real FIFA-style codes
+        codes = [base36(i, 3) for i in range(count)]
+        Team.objects.bulk_create(
+            [Team(name=f'Synthetic FC {code}', code=code) for code in codes],
+            ignore_conflicts=True,
+        )
+        return list(Team.objects.filter(code__in=codes).values_list('id', flat=True).order_by('code'))
+
+    def generate_venues(self, count):
+        names = [f'Synthetic Stadium {i:04d}' for i in range(count)]
+        existing = set(Venue.objects.filter(name__in=names).values_list('name', flat=True))
+        new = []
+        for name in names:
+            city, country = self.rng.choice(CITIES)
+            capacity = self.rng.randrange(10_000, 70_000, 1000)
+            if name not in existing:
+                new.append(Venue(name=name, city=city, country=country, capacity=capacity))
+        Venue.objects.bulk_create(new)
+        return list(Venue.objects.filter(name__in=names).values_list('id', flat=True).order_by('name'))
+
+    def generate_categories(self):
+        categories = []
+        for name, description, prices, quantity in CATEGORIES:
+            category, _ = TicketCategory.objects.get_or_create(name=name, defaults={'description': description})
+            categories.append((category.id, prices, quantity))
+        return categories
+
+    def generate_matches(self, teams, venues, tournaments, per_tournament):
+        rng = self.rng
+        today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        groups = ['A', 'B', 'C', 'D']
+        knockouts = ['quarter'] * 4 + ['semi'] * 2 + ['third', 'final']
+        self.first_match_id = None
+        created = 0
+        batch = []
+        for t in range(tournaments):
+            # The last tournament starts next week; earlier ones are a year apart in the past
+            tournament_start = today + timedelta(days=7) - timedelta(days=365 * (tournaments - 1 - t))
+            completed = t < tournaments - 1
+            group_matches = max(0, per_tournament - len(knockouts))
+            for i in range(per_tournament):
+                home, away = rng.sample(teams, 2)
+                if i < group_matches:
+                    match_type, group = 'group', groups[i % 4]
+                else:
+                    match_type, group = knockouts[(i - group_matches) % len(knockouts)], ''
+                day, slot = divmod(i, 4)
+                kickoff = tournament_start + timedelta(days=day, hours=[13, 16, 19, 21][slot])
+                batch.append(Match(
+                    home_team_id=home, away_team_id=away, venue_id=rng.choice(venues),
+                    date_time=kickoff, group=group, match_type=match_type, is_completed=completed,
+                    home_score=rng.choice([0, 0, 1, 1, 1, 2, 2, 3, 4]) if completed else None,
+                    away_score=rng.choice([0, 0, 1, 1, 2, 2, 3]) if completed else None,
+                ))
+                if len(batch) >= self.batch_size:
+                    created += self._flush_matches(batch)
+                    batch = []
+        created += self._flush_matches(batch)
+        return created
+
+    def _flush_matches(self, batch):
+        if not batch:
+            return 0
+        # bulk_create skips Match.save(); standings are rebuilt once at the end
+        Match.objects.bulk_create(batch)
+        if self.first_match_id is None:
+            self.first_match_id = batch[0].pk
+        return len(batch)
+
+    def generate_prices(self, categories):
+        """Create price rows; returns {price_id: (kes, ugx, tzs, kickoff, seats)} for booking generation"""
+        rng = self.rng
+        matches = Match.objects.filter(id__gte=self.first_match_id).order_by('id').values_list('id', 'date_time')
+        batch = []
+        for match_id, kickoff in matches.iterator(chunk_size=self.batch_size):
+            demand = Decimal(rng.choice(['0.8', '0.9', '1.0', '1.0', '1.2', '1.5']))
+            for category_id, base, quantity in categories:
+                kes, ugx, tzs = (Decimal(base[c]) * demand for c in ('KES', 'UGX', 'TZS'))
+                batch.append(TicketPrice(
+                    match_id=match_id, category_id=category_id,
+                    price_kes=kes, price_ugx=ugx, price_tzs=tzs,
+                    base_price_kes=kes, base_price_ugx=ugx, base_price_tzs=tzs,
+                    available_quantity=quantity,
+                ))
+            if len(batch) >= self.batch_size:
+                TicketPrice.objects.bulk_create(batch)
+                batch = []
+        TicketPrice.objects.bulk_create(batch)
+
+        rows = TicketPrice.objects.filter(match_id__gte=self.first_match_id).values_list(
+            'id', 'price_kes', 'price_ugx', 'price_tzs', 'match__date_time', 'available_quantity'
+        )
+        return {row[0]: row[1:] for row in rows.iterator(chunk_size=self.batch_size)}
+
+    def generate_bookings(self, prices, total):
+        rng = self.rng
+        price_ids = sorted(prices)
+        currency = chooser(rng, CURRENCY_MIX)
+        methods = {c: chooser(rng, mix) for c, mix in PAYMENT_METHODS.items()}
+        status = chooser(rng, STATUS_MIX)
+        quantity = chooser(rng, QUANTITY_MIX)
+        created_field = Booking._meta.get_field('created_at')
+        updated_field = Booking._meta.get_field('updated_at')
+
+        # Active bookings take seats as book_ticket does, so no row sells past capacity;
+        # open_ids holds the rows with seats left
+        remaining = {price_id: prices[price_id][4] for price_id in price_ids}
+        open_ids = [price_id for price_id in price_ids if remaining[price_id]]
+        now = timezone.now()
+
+        ticket_counter = 0
+        start = time.monotonic()
+        with explicit_timestamps(created_field, updated_field):
+            for offset in range(0, total, self.batch_size):
+                bookings = []
+                for n in range(offset, min(offset + self.batch_size, total)):
+                    cur = currency()
+                    qty = quantity()
+                    method, payment_status = methods[cur](), status()
+                    if payment_status in ACTIVE_STATUSES:
+                        if not open_ids:
+                            raise CommandError(
+                                f'Sold out after {n:,} bookings; add --tournaments or --matches-per-tournament.'
+                            )
+                        index = rng.randrange(len(open_ids))
+                        price_id = open_ids[index]
+                        qty = min(qty, remaining[price_id])
+                        remaining[price_id] -= qty
+                        if not remaining[price_id]:
+                            open_ids[index] = open_ids[-1]
+                            open_ids.pop()
+                    else:
+                        price_id = rng.choice(price_ids)
+                    kes, ugx, tzs, kickoff = prices[price_id][:4]
+                    unit = {'KES': kes, 'UGX': ugx, 'TZS': tzs}[cur]
+                    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                    # Bookings for upcoming matches cannot have been made in the future
+                    created = min(
+                        kickoff - timedelta(minutes=rng.randrange(60, 60 * 24 * 60)),
+                        now - timedelta(minutes=rng.randrange(1, 60 * 24 * 30)),
+                    )
+                    email = f'{first.lower()}.{last.lower()}{n}@example.com'
+                    phone = f'+2547{rng.randrange(10_000_000, 99_999_999)}'
+                    bookings.append(Booking(
+                        ticket_price_id=price_id, quantity=qty, total_amount=unit * qty,
+                        currency=cur, payment_method=method, payment_status=payment_status,
+                        booking_reference=f'{self.prefix}{base36(n, 8)}',
+                        customer_name=f'{first} {last}',
+                        customer_email=email,
+                        customer_phone=phone,
+                        # bulk_create skips Booking.save(), which normally sets these
+                        email_key=email_key(email),
+                        phone_key=phone_key(phone),
+                        created_at=created, updated_at=created,
+                    ))
+
+                with transaction.atomic():
+                    Booking.objects.bulk_create(bookings)
+                    tickets = []
+                    for booking in bookings:
+                        for _ in range(booking.quantity):
+                            tickets.append(Ticket(
+                                booking_id=booking.pk,
+                                ticket_number=f'{self.prefix}{base36(ticket_counter, 10)}',
+                            ))
+                            ticket_counter += 1
+                    Ticket.objects.bulk_create(tickets, batch_size=self.batch_size)
+
+                done = offset + len(bookings)
+                if done % (self.batch_size * 20) == 0 or done == total:
+                    elapsed = time.monotonic() - start
+                    self.stdout.write(f'{done:,} bookings, {ticket_counter:,} tickets ({done / elapsed:,.0f} bookings/s)')
+
+        TicketPrice.objects.bulk_update(
+            [TicketPrice(id=price_id, available_quantity=seats) for price_id, seats in remaining.items()],
+            ['available_quantity'],
+            batch_size=self.batch_size,
+        )
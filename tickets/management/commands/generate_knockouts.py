@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from tickets.models import Match, Venue
+from tickets.standings import KnockoutNotReady, next_knockout_fixtures
+
+
+class Command(BaseCommand):
+    help = 'Create the next knockout round (quarter finals from the final group standings, then semis, third place and final)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--venue', type=int, help='Venue id (default: the largest venue)')
+        parser.add_argument('--start', help='Kick-off of the first fixture, ISO 8601 (default: two days after the last match)')
+        parser.add_argument('--interval-hours', type=int, default=24, help='Hours between consecutive fixtures')
+
+    def handle(self, *args, **options):
+        try:
+            fixtures = next_knockout_fixtures()
+        except KnockoutNotReady as exc:
+            raise CommandError(str(exc))
+
+        if options['venue']:
+            venue = Venue.objects.filter(id=options['venue']).first()
+            if venue is None:
+                raise CommandError(f"Venue {options['venue']} does not exist.")
+        else:
+            venue = Venue.objects.order_by('-capacity', 'id').first()
+
+        if options['start']:
+            kickoff = parse_datetime(options['start'])
+            if kickoff is None:
+                raise CommandError('--start must be an ISO 8601 datetime.')
+        else:
+            last = Match.objects.order_by('-date_time').values_list('date_time', flat=True).first()
+            kickoff = last + timedelta(days=2)
+
+        with transaction.atomic():
+            for i, (match_type, home_team_id, away_team_id) in enumerate(fixtures):
+                match = Match.objects.create(
+                    home_team_id=home_team_id,
+                    away_team_id=away_team_id,
+                    venue=venue,
+                    date_time=kickoff + timedelta(hours=options['interval_hours'] * i),
+                    group='',
+                    match_type=match_type,
+                )
+                self.stdout.write(f'Created {match.get_match_type_display()}: {match}')
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tickets.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete booking idempotency keys older than IDEMPOTENCY_KEY_TTL_HOURS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Keys deleted per statement')
+
+    def handle(self, *args, **options):
+        ttl = timedelta(hours=getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24))
+        cutoff = timezone.now() - ttl
+        expired = IdempotencyKey.objects.filter(created_at__lt=cutoff).order_by('created_at')
+
+        # Short delete statements keep locks brief on a live table
+        deleted = 0
+        while True:
+            ids = list(expired.values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} idempotency keys older than {cutoff:%Y-%m-%d %H:%M}'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tickets.standings import rebuild_standings
+
+
+class Command(BaseCommand):
+    help = 'Recompute all group standings from the recorded match results'
+
+    def handle(self, *args, **options):
+        rows = rebuild_standings()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt standings: {rows} team rows'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from tickets.pricing import reprice
+
+
+class Command(BaseCommand):
+    help = 'Reprice ticket categories of open matches from recent sales velocity (PRICING_TIERS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window-hours', type=float, default=None, help='Sales window in hours (default: PRICING_WINDOW_HOURS)')
+        parser.add_argument('--dry-run', action='store_true', help='Compute the new prices without saving them')
+
+    def handle(self, *args, **options):
+        run = reprice(window_hours=options['window_hours'], dry_run=options['dry_run'])
+        prefix = 'Would change' if options['dry_run'] else 'Changed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} {run.changed} of {run.considered} price rows across {run.matches} matches'
+        ))
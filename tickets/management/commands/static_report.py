@@ -0,0 +1,92 @@
+import gzip
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from tickets.lookup import confirmation_token
+from tickets.models import Booking, Match
+from tickets.storage import compress_variants
+
+
+class Command(BaseCommand):
+    help = 'Report per-page transfer sizes with static assets served separately versus inlined'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--match', type=int, help='Match id used for the match pages (default: first match)')
+        parser.add_argument('--booking', type=int, help='Booking id used for the confirmation page (default: first booking)')
+
+    def handle(self, *args, **options):
+        match_id = options['match'] or Match.objects.values_list('id', flat=True).order_by('id').first()
+        bookings = Booking.objects.order_by('id')
+        if options['booking']:
+            bookings = bookings.filter(id=options['booking'])
+        reference = bookings.values_list('booking_reference', flat=True).first()
+        if match_id is None:
+            raise CommandError('No matches in the database; run populate_data.py first.')
+
+        pages = [
+            ('home', reverse('home')),
+            ('matches', reverse('matches')),
+            ('match_detail', reverse('match_detail', args=[match_id])),
+            ('book_ticket', reverse('book_ticket', args=[match_id])),
+            ('search_matches', reverse('search_matches') + '?q=a'),
+        ]
+        if reference is not None:
+            pages.append(('booking_confirmation', reverse('booking_confirmation', args=[reference, confirmation_token(reference)])))
+
+        asset_pattern = re.compile(r'(?:href|src)="%s([^"]+)"' % re.escape(settings.STATIC_URL))
+        client = Client()
+
+        self.stdout.write(
+            f"{'page':<22}{'html.gz':>10}{'assets':>10}{'assets.cz':>11}"
+            f"{'first':>10}{'repeat':>10}{'inlined':>10}{'saved':>10}"
+        )
+        for label, url in pages:
+            response = client.get(url)
+            if response.status_code != 200:
+                self.stderr.write(f'{label}: HTTP {response.status_code}, skipped')
+                continue
+            html = response.content
+            html_gz = len(gzip.compress(html))
+
+            assets_raw = b''
+            assets_compressed = 0
+            for name in sorted(set(asset_pattern.findall(html.decode()))):
+                data = self.read_asset(name)
+                assets_raw += data
+                variants = compress_variants(data)
+                assets_compressed += min([len(data)] + [len(v) for v in variants.values()])
+
+            # Page as it was shipped with every <style>/<script> block inlined
+            inlined = len(gzip.compress(html + assets_raw))
+            first = html_gz + assets_compressed
+            repeat = html_gz
+            self.stdout.write(
+                f'{label:<22}{html_gz:>10}{len(assets_raw):>10}{assets_compressed:>11}'
+                f'{first:>10}{repeat:>10}{inlined:>10}{inlined - repeat:>10}'
+            )
+
+        self.stdout.write(
+            'Bytes. assets.cz: best pre-built variant (br when available, else gzip). '
+            'first/repeat: transfer on a cold and a warm browser cache. '
+            'inlined: gzip transfer with the assets embedded in every page. '
+            'saved: bytes saved on each repeat view.'
+        )
+
+    def read_asset(self, name):
+        candidates = []
+        if settings.STATIC_ROOT:
+            candidates.append(os.path.join(settings.STATIC_ROOT, name))
+        found = finders.find(name)
+        if found:
+            candidates.append(found)
+        for path in candidates:
+            if os.path.isfile(path):
+                with open(path, 'rb') as f:
+                    return f.read()
+        raise CommandError(f'Static file {name} not found; run collectstatic or check STATICFILES_DIRS.')
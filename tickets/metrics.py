@@ -0,0 +1,143 @@
+import threading
+import time
+from contextvars import ContextVar
+
+from django.template.backends.django import Template as DjangoTemplate
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current_stats = ContextVar('tickets_request_stats', default=None)
+
+
+class RequestStats:
+    """Counters collected while a single request is being handled"""
+
+    __slots__ = ('queries', 'db_time', 'template_time', 'trace')
+
+    def __init__(self, trace=False):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        # Only sampled requests keep the individual (sql, duration) pairs
+        self.trace = [] if trace else None
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += duration
+            if self.trace is not None:
+                self.trace.append((sql, duration))
+
+
+def activate(stats):
+    return _current_stats.set(stats)
+
+
+def deactivate(token):
+    _current_stats.reset(token)
+
+
+_template_timer_installed = False
+
+
+def install_template_timer():
+    """Wrap the Django template backend so render time is charged to the current request"""
+    global _template_timer_installed
+    if _template_timer_installed:
+        return
+    original_render = DjangoTemplate.render
+
+    def timed_render(self, context=None, request=None):
+        stats = _current_stats.get()
+        if stats is None:
+            return original_render(self, context, request)
+        start = time.perf_counter()
+        try:
+            return original_render(self, context, request)
+        finally:
+            stats.template_time += time.perf_counter() - start
+
+    DjangoTemplate.render = timed_render
+    _template_timer_installed = True
+
+
+class ViewMetrics:
+    __slots__ = ('count', 'latency_sum', 'buckets', 'queries', 'db_time', 'template_time', 'over_budget')
+
+    def __init__(self):
+        self.count = 0
+        self.latency_sum = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.over_budget = 0
+
+
+class MetricsRegistry:
+    """Process-wide aggregates keyed by URL name"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view_name, latency, stats, over_budget=False):
+        with self._lock:
+            metrics = self._views.get(view_name)
+            if metrics is None:
+                metrics = self._views[view_name] = ViewMetrics()
+            metrics.count += 1
+            metrics.latency_sum += latency
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    metrics.buckets[i] += 1
+                    break
+            metrics.queries += stats.queries
+            metrics.db_time += stats.db_time
+            metrics.template_time += stats.template_time
+            if over_budget:
+                metrics.over_budget += 1
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+    def render_prometheus(self):
+        """Serialize the aggregates in the Prometheus text exposition format"""
+        with self._lock:
+            snapshot = sorted(self._views.items())
+
+        lines = [
+            '# HELP tickets_request_duration_seconds Request latency per URL name.',
+            '# TYPE tickets_request_duration_seconds histogram',
+        ]
+        for view_name, m in snapshot:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, m.buckets):
+                cumulative += count
+                lines.append(f'tickets_request_duration_seconds_bucket{{view="{view_name}",le="{bound}"}} {cumulative}')
+            lines.append(f'tickets_request_duration_seconds_bucket{{view="{view_name}",le="+Inf"}} {m.count}')
+            lines.append(f'tickets_request_duration_seconds_sum{{view="{view_name}"}} {m.latency_sum:.6f}')
+            lines.append(f'tickets_request_duration_seconds_count{{view="{view_name}"}} {m.count}')
+
+        counters = [
+            ('tickets_db_queries_total', 'Database queries executed per URL name.', 'queries', '{}'),
+            ('tickets_db_duration_seconds_total', 'Time spent in the database per URL name.', 'db_time', '{:.6f}'),
+            ('tickets_template_render_seconds_total', 'Time spent rendering templates per URL name.', 'template_time', '{:.6f}'),
+            ('tickets_requests_over_budget_total', 'Requests exceeding the query or latency budget.', 'over_budget', '{}'),
+        ]
+        for name, help_text, attr, fmt in counters:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for view_name, m in snapshot:
+                lines.append(f'{name}{{view="{view_name}"}} {fmt.format(getattr(m, attr))}')
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,129 @@
+import logging
+import mimetypes
+import os
+import posixpath
+import random
+import time
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.db import connection
+from django.http import FileResponse
+from django.utils._os import safe_join
+
+from . import metrics
+
+logger = logging.getLogger('tickets.performance')
+
+
+class PerformanceMiddleware:
+    """Record latency, query count, DB time and template time per URL name"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.query_budget = getattr(settings, 'PERF_QUERY_BUDGET', 20)
+        self.latency_budget = getattr(settings, 'PERF_LATENCY_BUDGET_MS', 500) / 1000
+        self.trace_sample_rate = getattr(settings, 'PERF_TRACE_SAMPLE_RATE', 0.0)
+        metrics.install_template_timer()
+
+    def __call__(self, request):
+        stats = metrics.RequestStats(trace=random.random() < self.trace_sample_rate)
+        token = metrics.activate(stats)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(stats.db_wrapper):
+                response = self.get_response(request)
+        finally:
+            metrics.deactivate(token)
+        latency = time.perf_counter() - start
+
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        over_budget = stats.queries > self.query_budget or latency > self.latency_budget
+        if over_budget:
+            logger.warning(
+                '%s %s over budget: %.1f ms, %d queries (%.1f ms db, %.1f ms templates)',
+                request.method, view_name, latency * 1000, stats.queries,
+                stats.db_time * 1000, stats.template_time * 1000,
+            )
+        if stats.trace:
+            for sql, duration in stats.trace:
+                logger.info('%s %s query %.2f ms: %s', request.method, view_name, duration * 1000, sql)
+
+        metrics.registry.observe(view_name, latency, stats, over_budget)
+        return response
+
+
+def accepted_encodings(header):
+    """{coding: q-value} from an Accept-Encoding header; q=0 means not acceptable"""
+    accepted = {}
+    for item in header.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.lower()] = quality
+    return accepted
+
+
+class PrecompressedStaticMiddleware:
+    """
+    Serve collected static files, preferring the .br/.gz variants built by
+    CompressedManifestStaticFilesStorage, with far-future caching for
+    fingerprinted names. In DEBUG runserver's static handler is used instead.
+    """
+
+    ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.root = os.fspath(settings.STATIC_ROOT)
+        self.max_age = getattr(settings, 'STATIC_CACHE_MAX_AGE', 60 * 60 * 24 * 365)
+        self.fingerprinted = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            response = self.serve(request, request.path_info[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        name = posixpath.normpath(unquote(name)).lstrip('/')
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        encoding = None
+        for candidate, suffix in self.ENCODINGS:
+            if accepted.get(candidate, accepted.get('*', 0)) > 0 and os.path.isfile(path + suffix):
+                encoding = candidate
+                break
+
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        served_path = path + suffix if encoding else path
+        response = FileResponse(open(served_path, 'rb'), content_type=content_type)
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Vary'] = 'Accept-Encoding'
+        if name in self.fingerprinted:
+            response['Cache-Control'] = f'public, max-age={self.max_age}, immutable'
+        else:
+            response['Cache-Control'] = 'public, max-age=60'
+        return response
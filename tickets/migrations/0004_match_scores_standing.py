@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0003_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='away_score',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='home_score',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='match',
+            name='group',
+            field=models.CharField(blank=True, choices=[('A', 'Group A'), ('B', 'Group B'), ('C', 'Group C'), ('D', 'Group D')], max_length=1),
+        ),
+        migrations.CreateModel(
+            name='Standing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group', models.CharField(max_length=1)),
+                ('played', models.IntegerField(default=0)),
+                ('won', models.IntegerField(default=0)),
+                ('drawn', models.IntegerField(default=0)),
+                ('lost', models.IntegerField(default=0)),
+                ('goals_for', models.IntegerField(default=0)),
+                ('goals_against', models.IntegerField(default=0)),
+                ('goal_difference', models.IntegerField(default=0)),
+                ('points', models.IntegerField(default=0)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standings', to='tickets.team')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['group', '-points', '-goal_difference', '-goals_for'], name='tickets_sta_group_bb278b_idx')],
+                'unique_together': {('group', 'team')},
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0004_match_scores_standing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticketprice',
+            name='base_price_kes',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='ticketprice',
+            name='base_price_tzs',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='ticketprice',
+            name='base_price_ugx',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.CreateModel(
+            name='TicketPriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('changed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('sales_velocity', models.FloatField(help_text='Tickets sold per hour over the pricing window')),
+                ('multiplier', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('old_price_ugx', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('old_price_kes', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('old_price_tzs', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('new_price_ugx', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('new_price_kes', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('new_price_tzs', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('ticket_price', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history', to='tickets.ticketprice')),
+            ],
+            options={
+                'verbose_name_plural': 'ticket price history',
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:31
+
+import django.core.validators
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0006_archivedbooking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticketprice',
+            name='held_quantity',
+            field=models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AddField(
+            model_name='ticketprice',
+            name='released_quantity',
+            field=models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ('customer_name', models.CharField(max_length=200)),
+                ('customer_email', models.EmailField(max_length=254)),
+                ('customer_phone', models.CharField(max_length=20)),
+                ('status', models.CharField(choices=[('waiting', 'Waiting'), ('offered', 'Offered'), ('claimed', 'Claimed'), ('expired', 'Expired')], default='waiting', max_length=10)),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('offered_at', models.DateTimeField(blank=True, null=True)),
+                ('offer_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tickets.booking')),
+                ('ticket_price', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='tickets.ticketprice')),
+            ],
+            options={
+                'verbose_name_plural': 'waitlist entries',
+                'indexes': [models.Index(fields=['ticket_price', 'status', 'id'], name='tickets_wai_ticket__38bb99_idx'), models.Index(fields=['status', 'offer_expires_at'], name='tickets_wai_status_17345f_idx')],
+            },
+        ),
+    ]
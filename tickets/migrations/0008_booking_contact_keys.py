@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:32
+
+from django.db import migrations, models
+
+from tickets.contact import email_key, phone_key
+
+
+def backfill_contact_keys(apps, schema_editor):
+    Booking = apps.get_model('tickets', 'Booking')
+    last_id = 0
+    while True:
+        batch = list(
+            Booking.objects.filter(id__gt=last_id).order_by('id')
+            .only('id', 'customer_email', 'customer_phone')[:2000]
+        )
+        if not batch:
+            break
+        for booking in batch:
+            booking.email_key = email_key(booking.customer_email)
+            booking.phone_key = phone_key(booking.customer_phone)
+        Booking.objects.bulk_update(batch, ['email_key', 'phone_key'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_waitlist'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='email_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='phone_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_contact_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+# Booking statuses that hold seats (tickets.waitlist.ACTIVE_STATUSES)
+ACTIVE_STATUSES = ('pending', 'completed')
+
+
+def reconcile_seats(apps, schema_editor):
+    """
+    Bookings made before 0007 never took seats from available_quantity, but
+    cancelling one now releases its seats. Take them out of general sale so
+    inventory matches the active bookings.
+    """
+    Booking = apps.get_model('tickets', 'Booking')
+    TicketPrice = apps.get_model('tickets', 'TicketPrice')
+    cutover = (
+        MigrationRecorder(schema_editor.connection).migration_qs
+        .filter(app='tickets', name='0007_waitlist')
+        .values_list('applied', flat=True).first()
+    ) or timezone.now()
+    seats = (
+        Booking.objects.filter(payment_status__in=ACTIVE_STATUSES, created_at__lt=cutover)
+        .values('ticket_price_id')
+        .annotate(seats=Sum('quantity'))
+        .values_list('ticket_price_id', 'seats')
+    )
+    for ticket_price_id, quantity in seats:
+        TicketPrice.objects.filter(id=ticket_price_id).update(
+            available_quantity=Greatest(F('available_quantity') - quantity, Value(0))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0008_booking_contact_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(reconcile_seats, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,11 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
+import uuid
+
+from . import contact
 
 class Team(models.Model):
     name = models.CharField(max_length=100)
@@ -25,7 +29,7 @@ class Match(models.Model):
     away_team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='away_matches')
     venue = models.ForeignKey(Venue, on_delete=models.CASCADE)
     date_time = models.DateTimeField()
-    group = models.CharField(max_length=1, choices=[('A', 'Group A'), ('B', 'Group B'), ('C', 'Group C'), ('D', 'Group D')])
+    group = models.CharField(max_length=1, blank=True, choices=[('A', 'Group A'), ('B', 'Group B'), ('C', 'Group C'), ('D', 'Group D')])
     match_type = models.CharField(max_length=20, choices=[
         ('group', 'Group Stage'),
         ('quarter', 'Quarter Final'),
@@ -34,9 +38,47 @@ class Match(models.Model):
         ('final', 'Final')
     ], default='group')
     is_completed = models.BooleanField(default=False)
+    home_score = models.PositiveSmallIntegerField(null=True, blank=True)
+    away_score = models.PositiveSmallIntegerField(null=True, blank=True)
     
     def __str__(self):
         return f"{self.home_team.code} vs {self.away_team.code} - {self.date_time.strftime('%Y-%m-%d %H:%M')}"
+    
+    def save(self, *args, **kwargs):
+        from .standings import RESULT_FIELDS, update_standings
+        
+        # Standings are updated incrementally from the previous and new result;
+        # the row lock stops two concurrent edits reversing the same old result
+        current = {field: getattr(self, field) for field in RESULT_FIELDS}
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = Match.objects.select_for_update().filter(pk=self.pk).values(*RESULT_FIELDS).first()
+            super().save(*args, **kwargs)
+            if previous != current:
+                update_standings(previous, current)
+
+class Standing(models.Model):
+    """Group table row, maintained incrementally by Match.save (see tickets.standings)"""
+    group = models.CharField(max_length=1)
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='standings')
+    played = models.IntegerField(default=0)
+    won = models.IntegerField(default=0)
+    drawn = models.IntegerField(default=0)
+    lost = models.IntegerField(default=0)
+    goals_for = models.IntegerField(default=0)
+    goals_against = models.IntegerField(default=0)
+    goal_difference = models.IntegerField(default=0)
+    points = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['group', 'team']
+        indexes = [
+            models.Index(fields=['group', '-points', '-goal_difference', '-goals_for']),
+        ]
+    
+    def __str__(self):
+        return f"Group {self.group} - {self.team.code}: {self.points} pts"
 
 class TicketCategory(models.Model):
     name = models.CharField(max_length=100)
@@ -52,6 +94,14 @@ class TicketPrice(models.Model):
     price_kes = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
     price_tzs = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
     available_quantity = models.IntegerField(validators=[MinValueValidator(0)])
+    # Prices the pricing engine scales from; empty means the current price is the base
+    base_price_ugx = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    base_price_kes = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    base_price_tzs = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # Seats freed by cancelled/failed bookings waiting for the waitlist allocator,
+    # and seats set aside for open waitlist offers; neither is on general sale
+    released_quantity = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+    held_quantity = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     
     class Meta:
         unique_together = ['match', 'category']
@@ -59,6 +109,25 @@ class TicketPrice(models.Model):
     def __str__(self):
         return f"{self.match} - {self.category.name}"
 
+class TicketPriceHistory(models.Model):
+    """Audit trail of changes made by the pricing engine"""
+    ticket_price = models.ForeignKey(TicketPrice, on_delete=models.CASCADE, related_name='history')
+    changed_at = models.DateTimeField(default=timezone.now, db_index=True)
+    sales_velocity = models.FloatField(help_text='Tickets sold per hour over the pricing window')
+    multiplier = models.DecimalField(max_digits=5, decimal_places=2)
+    old_price_ugx = models.DecimalField(max_digits=10, decimal_places=2)
+    old_price_kes = models.DecimalField(max_digits=10, decimal_places=2)
+    old_price_tzs = models.DecimalField(max_digits=10, decimal_places=2)
+    new_price_ugx = models.DecimalField(max_digits=10, decimal_places=2)
+    new_price_kes = models.DecimalField(max_digits=10, decimal_places=2)
+    new_price_tzs = models.DecimalField(max_digits=10, decimal_places=2)
+    
+    class Meta:
+        verbose_name_plural = 'ticket price history'
+    
+    def __str__(self):
+        return f"{self.ticket_price_id} x{self.multiplier} at {self.changed_at:%Y-%m-%d %H:%M}"
+
 class Booking(models.Model):
     PAYMENT_STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -90,6 +159,9 @@ class Booking(models.Model):
     customer_name = models.CharField(max_length=200)
     customer_email = models.EmailField()
     customer_phone = models.CharField(max_length=20)
+    # Hashed, normalised contact details for "find my booking" and admin search (tickets.contact)
+    email_key = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    phone_key = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -101,7 +173,20 @@ class Booking(models.Model):
             import random
             import string
             self.booking_reference = ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
-        super().save(*args, **kwargs)
+        self.email_key = contact.email_key(self.customer_email)
+        self.phone_key = contact.phone_key(self.customer_phone)
+        if self.pk is None:
+            super().save(*args, **kwargs)
+            return
+        
+        from .waitlist import SEAT_FIELDS, booking_changed
+        # Seats go back (or are taken again) in the same transaction as the change;
+        # the row lock stops two concurrent cancels both releasing them
+        with transaction.atomic():
+            previous = Booking.objects.select_for_update().filter(pk=self.pk).values(*SEAT_FIELDS).first()
+            super().save(*args, **kwargs)
+            if previous is not None:
+                booking_changed(self, previous)
 
 class Ticket(models.Model):
     booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='tickets')
@@ -112,9 +197,103 @@ class Ticket(models.Model):
     def __str__(self):
         return f"Ticket {self.ticket_number}"
     
+    @staticmethod
+    def new_ticket_number():
+        # Also used by callers that bulk_create tickets (save() does not run)
+        import random
+        import string
+        return ''.join(random.choices(string.ascii_uppercase + string.digits, k=12))
+    
     def save(self, *args, **kwargs):
         if not self.ticket_number:
-            import random
-            import string
-            self.ticket_number = ''.join(random.choices(string.ascii_uppercase + string.digits, k=12))
+            self.ticket_number = self.new_ticket_number()
         super().save(*args, **kwargs)
+
+class ArchivedBooking(models.Model):
+    """
+    A booking of a completed match and its tickets, moved out of the hot tables
+    by manage.py archive_bookings. The full rows are kept as zlib-compressed JSON.
+    """
+    original_id = models.BigIntegerField(unique=True)
+    booking_reference = models.CharField(max_length=20, unique=True)
+    ticket_price = models.ForeignKey(TicketPrice, on_delete=models.CASCADE, related_name='+')
+    customer_name = models.CharField(max_length=200)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    payload = models.BinaryField()
+    
+    def __str__(self):
+        return f"Archived booking {self.booking_reference} - {self.customer_name}"
+
+class IdempotencyKey(models.Model):
+    """Key issued with the booking form so a resubmitted POST maps to the original booking"""
+    key = models.UUIDField(unique=True)
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    def __str__(self):
+        return str(self.key)
+
+class OutboxMessage(models.Model):
+    CHANNEL_CHOICES = [
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='outbox_messages', null=True, blank=True)
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=254)
+    subject = models.CharField(max_length=200, blank=True)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_channel_display()} to {self.recipient} ({self.status})"
+
+class WaitlistEntry(models.Model):
+    """A customer waiting for seats in a sold-out ticket category"""
+    STATUS_CHOICES = [
+        ('waiting', 'Waiting'),
+        ('offered', 'Offered'),
+        ('claimed', 'Claimed'),
+        ('expired', 'Expired'),
+    ]
+
+    ticket_price = models.ForeignKey(TicketPrice, on_delete=models.CASCADE, related_name='waitlist_entries')
+    quantity = models.IntegerField(validators=[MinValueValidator(1)])
+    customer_name = models.CharField(max_length=200)
+    customer_email = models.EmailField()
+    customer_phone = models.CharField(max_length=20)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='waiting')
+    # Sent in the offer link so the claim page does not expose the PK
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    booking = models.ForeignKey(Booking, on_delete=models.SET_NULL, related_name='+', null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    offered_at = models.DateTimeField(null=True, blank=True)
+    offer_expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'waitlist entries'
+        indexes = [
+            models.Index(fields=['ticket_price', 'status', 'id']),
+            models.Index(fields=['status', 'offer_expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.customer_name} x{self.quantity} for {self.ticket_price_id} ({self.status})"
@@ -0,0 +1,160 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import OutboxMessage
+from .sms import get_sms_backend
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_booking_confirmation(booking, tickets):
+    """Queue the confirmation email and SMS; call inside the booking transaction"""
+    context = {
+        'booking': booking,
+        'match': booking.ticket_price.match,
+        'tickets': tickets,
+    }
+    messages = [
+        OutboxMessage(
+            booking=booking,
+            channel='email',
+            recipient=booking.customer_email,
+            subject=f'Your CHAN 2024 tickets - {booking.booking_reference}',
+            body=render_to_string('tickets/outbox/booking_confirmation_email.txt', context),
+        ),
+    ]
+    if booking.customer_phone:
+        messages.append(OutboxMessage(
+            booking=booking,
+            channel='sms',
+            recipient=booking.customer_phone,
+            body=render_to_string('tickets/outbox/booking_confirmation_sms.txt', context).strip(),
+        ))
+    OutboxMessage.objects.bulk_create(messages)
+
+
+def enqueue_waitlist_offers(entries):
+    """Queue claim-link email and SMS for new waitlist offers; call inside the allocation transaction"""
+    messages = []
+    for entry in entries:
+        context = {
+            'entry': entry,
+            'match': entry.ticket_price.match,
+            'claim_url': _setting('SITE_URL', '') + reverse('waitlist_claim', args=[entry.token]),
+        }
+        messages.append(OutboxMessage(
+            channel='email',
+            recipient=entry.customer_email,
+            subject='Tickets available for you - CHAN 2024',
+            body=render_to_string('tickets/outbox/waitlist_offer_email.txt', context),
+        ))
+        if entry.customer_phone:
+            messages.append(OutboxMessage(
+                channel='sms',
+                recipient=entry.customer_phone,
+                body=render_to_string('tickets/outbox/waitlist_offer_sms.txt', context).strip(),
+            ))
+    OutboxMessage.objects.bulk_create(messages)
+
+
+def retry_delay(attempts):
+    """Exponential backoff after the given number of failed attempts"""
+    base = _setting('OUTBOX_RETRY_BACKOFF_SECONDS', 30)
+    cap = _setting('OUTBOX_RETRY_BACKOFF_MAX_SECONDS', 3600)
+    return timedelta(seconds=min(cap, base * 2 ** (attempts - 1)))
+
+
+def claim_batch(batch_size):
+    """
+    Lock a batch of due messages and push their next_attempt_at forward by the
+    lease, so concurrent dispatchers skip them while they are being sent.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=_setting('OUTBOX_LEASE_SECONDS', 300))
+    with transaction.atomic():
+        batch = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if batch:
+            OutboxMessage.objects.filter(id__in=[m.id for m in batch]).update(next_attempt_at=now + lease)
+    return batch
+
+
+def _send_emails(messages):
+    errors = {}
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as exc:
+        return {m.id: str(exc) or exc.__class__.__name__ for m in messages}
+    try:
+        for m in messages:
+            email = EmailMessage(m.subject, m.body, to=[m.recipient], connection=connection)
+            try:
+                email.send()
+            except Exception as exc:
+                errors[m.id] = str(exc) or exc.__class__.__name__
+    finally:
+        connection.close()
+    return errors
+
+
+def _send_sms(messages):
+    try:
+        results = get_sms_backend().send_messages([(m.recipient, m.body) for m in messages])
+    except Exception as exc:
+        return {m.id: str(exc) or exc.__class__.__name__ for m in messages}
+    return {m.id: error for m, error in zip(messages, results) if error}
+
+
+def dispatch_batch(batch_size=None):
+    """Send one batch of due messages. Returns (sent, failed) counts."""
+    batch = claim_batch(batch_size or _setting('OUTBOX_BATCH_SIZE', 200))
+    if not batch:
+        return 0, 0
+
+    errors = {}
+    emails = [m for m in batch if m.channel == 'email']
+    sms = [m for m in batch if m.channel == 'sms']
+    if emails:
+        errors.update(_send_emails(emails))
+    if sms:
+        errors.update(_send_sms(sms))
+
+    # Grouped UPDATEs instead of bulk_update(), whose per-row CASE expressions dominated dispatch time
+    now = timezone.now()
+    delivered = [m.id for m in batch if m.id not in errors]
+    for i in range(0, len(delivered), 500):
+        OutboxMessage.objects.filter(id__in=delivered[i:i + 500]).update(
+            status='sent', attempts=F('attempts') + 1, sent_at=now, last_error='',
+        )
+
+    max_attempts = _setting('OUTBOX_MAX_ATTEMPTS', 5)
+    retries = defaultdict(list)
+    for m in batch:
+        error = errors.get(m.id)
+        if error is None:
+            continue
+        attempts = m.attempts + 1
+        if attempts >= max_attempts:
+            retries[('failed', m.next_attempt_at, error)].append(m.id)
+        else:
+            retries[('pending', now + retry_delay(attempts), error)].append(m.id)
+    for (status, next_attempt_at, error), ids in retries.items():
+        OutboxMessage.objects.filter(id__in=ids).update(
+            status=status, attempts=F('attempts') + 1, next_attempt_at=next_attempt_at, last_error=error,
+        )
+
+    return len(delivered), len(errors)
@@ -0,0 +1,128 @@
+"""
+Demand-based repricing of TicketPrice rows.
+
+A run aggregates recent bookings into a sales velocity (tickets per hour) per
+price row in one GROUP BY query, maps each velocity to a multiplier from the
+PRICING_TIERS table in a single pass over all open price rows, then writes
+the changed rows with one bulk_update() and their audit rows with one
+bulk_create(), in one transaction.
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Booking, TicketPrice, TicketPriceHistory
+
+CURRENCIES = ('ugx', 'kes', 'tzs')
+
+# (minimum tickets sold per hour, multiplier applied to the base price)
+DEFAULT_TIERS = [
+    (0, '0.90'),
+    (2, '1.00'),
+    (10, '1.15'),
+    (30, '1.30'),
+]
+
+
+def price_snapshot_cache_key(match_id, currency):
+    return f'tickets:prices:{match_id}:{currency}'
+
+
+def invalidate_price_snapshots(match_ids):
+    """Drop the cached price lists of the given matches for every currency"""
+    keys = [price_snapshot_cache_key(match_id, currency.upper()) for match_id in match_ids for currency in CURRENCIES]
+    if keys:
+        cache.delete_many(keys)
+
+
+def sales_velocity(window):
+    """{ticket_price_id: tickets sold per hour} over the trailing window"""
+    hours = window.total_seconds() / 3600
+    sold = (
+        Booking.objects.filter(created_at__gte=timezone.now() - window, payment_status__in=['pending', 'completed'])
+        .values('ticket_price_id')
+        .annotate(sold=Sum('quantity'))
+        .values_list('ticket_price_id', 'sold')
+    )
+    return {ticket_price_id: quantity / hours for ticket_price_id, quantity in sold}
+
+
+def _tiers():
+    tiers = getattr(settings, 'PRICING_TIERS', DEFAULT_TIERS)
+    return sorted((threshold, Decimal(str(multiplier))) for threshold, multiplier in tiers)
+
+
+def _multiplier(velocity, tiers):
+    multiplier = tiers[0][1]
+    for threshold, tier_multiplier in tiers:
+        if velocity >= threshold:
+            multiplier = tier_multiplier
+    return multiplier
+
+
+@dataclass
+class PricingRun:
+    considered: int
+    changed: int
+    matches: int
+
+
+def reprice(window_hours=None, dry_run=False):
+    """Reprice every open (not completed) match's price rows. Returns a PricingRun."""
+    window = timedelta(hours=window_hours or getattr(settings, 'PRICING_WINDOW_HOURS', 24))
+    velocity = sales_velocity(window)
+    tiers = _tiers()
+    now = timezone.now()
+
+    columns = ['id', 'match_id']
+    for currency in CURRENCIES:
+        columns += [f'price_{currency}', f'base_price_{currency}']
+    rows = TicketPrice.objects.filter(match__is_completed=False).values(*columns)
+
+    changed = []
+    history = []
+    considered = 0
+    for row in rows.iterator(chunk_size=2000):
+        considered += 1
+        rate = velocity.get(row['id'], 0.0)
+        multiplier = _multiplier(rate, tiers)
+        update = TicketPrice(id=row['id'], match_id=row['match_id'])
+        old, new = {}, {}
+        for currency in CURRENCIES:
+            current = row[f'price_{currency}']
+            base = row[f'base_price_{currency}'] or current
+            old[currency] = current
+            new[currency] = (base * multiplier).quantize(Decimal('1'), rounding=ROUND_HALF_UP).quantize(Decimal('0.01'))
+            setattr(update, f'price_{currency}', new[currency])
+            # The first run pins today's price as the base so multipliers never compound
+            setattr(update, f'base_price_{currency}', base)
+        if new == old and all(row[f'base_price_{c}'] is not None for c in CURRENCIES):
+            continue
+        changed.append(update)
+        if new != old:
+            history.append(TicketPriceHistory(
+                ticket_price_id=row['id'],
+                changed_at=now,
+                sales_velocity=rate,
+                multiplier=multiplier,
+                **{f'old_price_{c}': old[c] for c in CURRENCIES},
+                **{f'new_price_{c}': new[c] for c in CURRENCIES},
+            ))
+
+    match_ids = {update.match_id for update in changed}
+    result = PricingRun(considered=considered, changed=len(history), matches=len(match_ids))
+    if dry_run or not changed:
+        return result
+
+    fields = [f'price_{c}' for c in CURRENCIES] + [f'base_price_{c}' for c in CURRENCIES]
+    with transaction.atomic():
+        TicketPrice.objects.bulk_update(changed, fields, batch_size=500)
+        TicketPriceHistory.objects.bulk_create(history, batch_size=500)
+        transaction.on_commit(lambda: invalidate_price_snapshots(match_ids))
+    return result
@@ -0,0 +1,48 @@
+import sys
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class BaseSMSBackend:
+    """Gateway interface used by the outbox dispatcher"""
+
+    def send_messages(self, messages):
+        """
+        Send a list of (recipient, body) pairs.
+        Return a list with None for each delivered message or an error string.
+        """
+        raise NotImplementedError
+
+
+class ConsoleBackend(BaseSMSBackend):
+    """Write messages to stdout, for development"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def send_messages(self, messages):
+        with self._lock:
+            for recipient, body in messages:
+                self.stream.write(f"SMS to {recipient}: {body}\n")
+            self.stream.flush()
+        return [None] * len(messages)
+
+
+# Messages delivered through LocmemBackend, for tests and benchmarks
+outbox = []
+
+
+class LocmemBackend(BaseSMSBackend):
+    """Keep messages in the module level ``outbox`` list"""
+
+    def send_messages(self, messages):
+        outbox.extend(messages)
+        return [None] * len(messages)
+
+
+def get_sms_backend():
+    backend = getattr(settings, 'SMS_BACKEND', 'tickets.sms.ConsoleBackend')
+    return import_string(backend)()
@@ -0,0 +1,215 @@
+"""
+Group standings, kept up to date incrementally.
+
+Match.save() passes the match's previous and new result to update_standings(),
+which reverses the old result and applies the new one with F() updates on the
+two affected Standing rows, so a result entry never rescans the group.
+Deleting a match (including queryset and cascade deletes) reverses its result
+through the post_delete handler below.
+rebuild_standings() recomputes everything from the match results.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Match, Standing
+
+RESULT_FIELDS = ('group', 'match_type', 'is_completed', 'home_team_id', 'away_team_id', 'home_score', 'away_score')
+
+STAT_FIELDS = ('played', 'won', 'drawn', 'lost', 'goals_for', 'goals_against', 'goal_difference', 'points')
+
+# Tiebreakers: points, goal difference, goals scored, then name
+STANDINGS_ORDER = ('-points', '-goal_difference', '-goals_for', 'team__name')
+
+POINTS = {'won': 3, 'drawn': 1, 'lost': 0}
+
+CACHE_KEY = 'tickets:standings'
+
+
+def _is_group_fixture(result):
+    return bool(result) and result['match_type'] == 'group' and bool(result['group'])
+
+
+def _has_result(result):
+    return (
+        _is_group_fixture(result) and result['is_completed']
+        and result['home_score'] is not None and result['away_score'] is not None
+    )
+
+
+def _fixture_rows(result):
+    """(group, team_id) table rows a fixture puts its teams in"""
+    if not _is_group_fixture(result):
+        return set()
+    return {(result['group'], result['home_team_id']), (result['group'], result['away_team_id'])}
+
+
+def _accumulate(deltas, result, sign):
+    """Add (sign=1) or remove (sign=-1) a match's contribution to ``deltas``"""
+    if not _is_group_fixture(result):
+        return
+    group = result['group']
+    home = deltas[(group, result['home_team_id'])]
+    away = deltas[(group, result['away_team_id'])]
+    if not _has_result(result):
+        return
+    for stats, goals_for, goals_against in (
+        (home, result['home_score'], result['away_score']),
+        (away, result['away_score'], result['home_score']),
+    ):
+        if goals_for > goals_against:
+            outcome = 'won'
+        elif goals_for == goals_against:
+            outcome = 'drawn'
+        else:
+            outcome = 'lost'
+        stats['played'] += sign
+        stats[outcome] += sign
+        stats['goals_for'] += sign * goals_for
+        stats['goals_against'] += sign * goals_against
+        stats['goal_difference'] += sign * (goals_for - goals_against)
+        stats['points'] += sign * POINTS[outcome]
+
+
+def update_standings(previous, current):
+    """Apply the change from one result to another (None: no match); call inside the match's transaction"""
+    deltas = defaultdict(lambda: defaultdict(int))
+    _accumulate(deltas, previous, -1)
+    _accumulate(deltas, current, 1)
+    if not deltas:
+        return
+
+    if current is not None:
+        # Teams appear in the table from their first fixture, before they have
+        # played. Not on delete: the team itself may be going in the same cascade.
+        Standing.objects.bulk_create(
+            [Standing(group=group, team_id=team_id) for group, team_id in deltas],
+            ignore_conflicts=True,
+        )
+    changed = False
+    for (group, team_id), stats in deltas.items():
+        changes = {field: F(field) + value for field, value in stats.items() if value}
+        if changes:
+            Standing.objects.filter(group=group, team_id=team_id).update(**changes)
+            changed = True
+
+    # As in rebuild_standings(), a team leaves a group's table with its last
+    # fixture there (moved to another group or deleted)
+    for group, team_id in _fixture_rows(previous) - _fixture_rows(current):
+        fixtures = Match.objects.filter(match_type='group', group=group).filter(
+            Q(home_team_id=team_id) | Q(away_team_id=team_id)
+        )
+        if not fixtures.exists():
+            Standing.objects.filter(group=group, team_id=team_id).delete()
+            changed = True
+    if changed:
+        transaction.on_commit(lambda: cache.delete(CACHE_KEY))
+
+
+@receiver(post_delete, sender=Match, dispatch_uid='tickets.standings.match_deleted')
+def match_deleted(sender, instance, **kwargs):
+    update_standings({field: getattr(instance, field) for field in RESULT_FIELDS}, None)
+
+
+def rebuild_standings():
+    """Recompute every table from the group-stage results. Returns the number of rows."""
+    deltas = defaultdict(lambda: defaultdict(int))
+    results = Match.objects.filter(match_type='group').exclude(group='').values(*RESULT_FIELDS)
+    for result in results.iterator():
+        _accumulate(deltas, result, 1)
+
+    with transaction.atomic():
+        Standing.objects.all().delete()
+        Standing.objects.bulk_create([
+            Standing(group=group, team_id=team_id, **stats)
+            for (group, team_id), stats in deltas.items()
+        ])
+    cache.delete(CACHE_KEY)
+    return len(deltas)
+
+
+def _group_tables():
+    tables = {}
+    rows = Standing.objects.order_by('group', *STANDINGS_ORDER).values(
+        'group', 'team_id', 'team__name', 'team__code', *STAT_FIELDS
+    )
+    for row in rows:
+        tables.setdefault(row['group'], []).append(row)
+    return tables
+
+
+def group_tables():
+    """{group: [rows in table order]}, cached until the next result is entered"""
+    tables = cache.get(CACHE_KEY)
+    if tables is None:
+        tables = _group_tables()
+        cache.set(CACHE_KEY, tables, getattr(settings, 'STANDINGS_CACHE_SECONDS', 300))
+    return tables
+
+
+# Group winners meet the runners-up of the paired group
+QUARTER_FINAL_PAIRINGS = [(('A', 1), ('B', 2)), (('B', 1), ('A', 2)), (('C', 1), ('D', 2)), (('D', 1), ('C', 2))]
+
+
+class KnockoutNotReady(Exception):
+    pass
+
+
+def _winner_and_loser(match):
+    if not match.is_completed or match.home_score is None or match.away_score is None:
+        raise KnockoutNotReady(f'{match} has no result yet.')
+    if match.home_score == match.away_score:
+        raise KnockoutNotReady(f'{match} is level; record the deciding score (including penalties).')
+    if match.home_score > match.away_score:
+        return match.home_team_id, match.away_team_id
+    return match.away_team_id, match.home_team_id
+
+
+def next_knockout_fixtures():
+    """
+    Pairings (match_type, home_team_id, away_team_id) for the next knockout
+    round that does not exist yet. Raises KnockoutNotReady if the previous
+    round is unfinished.
+    """
+    rounds = defaultdict(list)
+    for match in Match.objects.exclude(match_type='group').order_by('date_time', 'id'):
+        rounds[match.match_type].append(match)
+
+    if not rounds['quarter']:
+        pending = Match.objects.filter(match_type='group').exclude(
+            is_completed=True, home_score__isnull=False, away_score__isnull=False
+        ).count()
+        if pending:
+            raise KnockoutNotReady(f'{pending} group matches have no result yet.')
+        tables = _group_tables()
+        fixtures = []
+        for (home_group, home_pos), (away_group, away_pos) in QUARTER_FINAL_PAIRINGS:
+            try:
+                home = tables[home_group][home_pos - 1]['team_id']
+                away = tables[away_group][away_pos - 1]['team_id']
+            except (KeyError, IndexError):
+                raise KnockoutNotReady(f'Groups {home_group} and {away_group} need at least two teams.')
+            fixtures.append(('quarter', home, away))
+        return fixtures
+
+    if not rounds['semi']:
+        if len(rounds['quarter']) != 4:
+            raise KnockoutNotReady(f"Expected 4 quarter finals, found {len(rounds['quarter'])}.")
+        winners = [_winner_and_loser(m)[0] for m in rounds['quarter']]
+        return [('semi', winners[0], winners[1]), ('semi', winners[2], winners[3])]
+
+    if not rounds['final']:
+        if len(rounds['semi']) != 2:
+            raise KnockoutNotReady(f"Expected 2 semi finals, found {len(rounds['semi'])}.")
+        results = [_winner_and_loser(m) for m in rounds['semi']]
+        return [
+            ('third', results[0][1], results[1][1]),
+            ('final', results[0][0], results[1][0]),
+        ]
+
+    raise KnockoutNotReady('All knockout fixtures already exist.')
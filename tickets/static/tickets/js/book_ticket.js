@@ -0,0 +1,115 @@
+$(document).ready(function() {
+    let selectedCurrency = 'KES';
+    let selectedTicket = null;
+    let selectedQuantity = 1;
+    let selectedPayment = null;
+
+    // Currency tab switching
+    $('.currency-tab').click(function() {
+        $('.currency-tab').removeClass('active');
+        $(this).addClass('active');
+        selectedCurrency = $(this).data('currency');
+        $('#id_currency').val(selectedCurrency);
+        updateTicketPrices();
+        updatePaymentMethods();
+        updateSummary();
+    });
+
+    // Ticket selection
+    $('.ticket-option').click(function() {
+        if ($(this).data('available') == 0) return;
+
+        $('.ticket-option').removeClass('selected');
+        $('.quantity-selector').hide();
+
+        $(this).addClass('selected');
+        $(this).find('.quantity-selector').show();
+
+        selectedTicket = {
+            id: $(this).data('price-id'),
+            name: $(this).find('.ticket-name').text(),
+            kes: $(this).data('kes'),
+            ugx: $(this).data('ugx'),
+            tzs: $(this).data('tzs'),
+            available: $(this).data('available')
+        };
+
+        $('#id_ticket_price').val(selectedTicket.id);
+        updateSummary();
+        checkFormValid();
+    });
+
+    // Payment method selection
+    $('.payment-option').click(function() {
+        $('.payment-option').removeClass('selected');
+        $(this).addClass('selected');
+        selectedPayment = $(this).data('method');
+        $('#id_payment_method').val(selectedPayment);
+        checkFormValid();
+    });
+
+    function updateTicketPrices() {
+        $('.ticket-option').each(function() {
+            const price = $(this).data(selectedCurrency.toLowerCase());
+            $(this).find('.ticket-price').text(selectedCurrency + ' ' + price);
+        });
+    }
+
+    function updatePaymentMethods() {
+        $('.payment-option').each(function() {
+            const countries = $(this).data('countries').split(',');
+            if (countries.includes(selectedCurrency)) {
+                $(this).show();
+            } else {
+                $(this).hide();
+                if ($(this).hasClass('selected')) {
+                    $(this).removeClass('selected');
+                    selectedPayment = null;
+                    $('#id_payment_method').val('');
+                }
+            }
+        });
+    }
+
+    function updateSummary() {
+        if (selectedTicket) {
+            const price = selectedTicket[selectedCurrency.toLowerCase()];
+            const total = price * selectedQuantity;
+
+            $('#summary-category').text(selectedTicket.name);
+            $('#summary-quantity').text(selectedQuantity);
+            $('#summary-unit-price').text(selectedCurrency + ' ' + price);
+            $('#summary-total').text(selectedCurrency + ' ' + total);
+        }
+    }
+
+    function checkFormValid() {
+        const isValid = selectedTicket && selectedPayment &&
+                        $('#id_customer_name').val() &&
+                        $('#id_customer_email').val() &&
+                        $('#id_customer_phone').val();
+
+        $('#submit-btn').prop('disabled', !isValid);
+    }
+
+    // Form validation
+    $('#id_customer_name, #id_customer_email, #id_customer_phone').on('input', checkFormValid);
+
+    // Initialize
+    $('#id_currency').val('KES');
+    $('#id_quantity').val(1);
+    updatePaymentMethods();
+});
+
+function changeQuantity(delta) {
+    const input = $('.ticket-option.selected .quantity-input');
+    const current = parseInt(input.val());
+    const max = parseInt(input.attr('max'));
+    const min = parseInt(input.attr('min'));
+
+    const newValue = Math.max(min, Math.min(max, current + delta));
+    input.val(newValue);
+    selectedQuantity = newValue;
+    $('#id_quantity').val(newValue);
+    updateSummary();
+}
@@ -0,0 +1,27 @@
+$(document).ready(function() {
+    // Currency selector functionality
+    $('.currency-option').click(function() {
+        $('.currency-option').removeClass('active');
+        $(this).addClass('active');
+
+        const selectedCurrency = $(this).data('currency');
+        updatePrices(selectedCurrency);
+    });
+
+    function updatePrices(currency) {
+        $('.category-price').each(function() {
+            const price = $(this).data(currency.toLowerCase());
+            $(this).text(currency + ' ' + price);
+        });
+    }
+
+    // Ticket category selection
+    $('.ticket-category').click(function() {
+        if ($(this).find('.availability-text').hasClass('sold-out')) {
+            return;
+        }
+
+        $('.ticket-category').removeClass('selected');
+        $(this).addClass('selected');
+    });
+});
@@ -0,0 +1,9 @@
+function searchFor(term) {
+    document.querySelector('input[name="q"]').value = term;
+    document.querySelector('form').submit();
+}
+
+// Auto-focus search input
+$(document).ready(function() {
+    $('input[name="q"]').focus();
+});
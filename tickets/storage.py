@@ -0,0 +1,62 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # Optional; without it only .gz variants are built
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map')
+
+
+def compress_variants(data):
+    """Return {suffix: bytes} for the pre-compressed variants worth keeping"""
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    # Tiny files can grow when compressed; serving those is pointless
+    return {suffix: body for suffix, body in variants.items() if len(body) < len(data) * 0.95}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Content-hash fingerprinted static files with pre-built .gz/.br siblings.
+
+    Deploys must run collectstatic. Without it (tests, DEBUG=False checkouts)
+    there is no manifest, so URLs fall back to the unhashed names instead of
+    failing every page.
+    """
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Not collected: neither a manifest entry nor a file to hash
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.add(hashed_name)
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+        for hashed_name in hashed_names:
+            self.compress(hashed_name)
+
+    def compress(self, name):
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return
+        with self.open(name) as f:
+            data = f.read()
+        for suffix, body in compress_variants(data).items():
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(body))
@@ -1,3 +1,757 @@
-from django.test import TestCase
+import gzip
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.forms.models import model_to_dict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import api, sms
+from . import metrics as perf_metrics
+from .archive import archive_batch, load_booking
+from .forms import BookingAdminForm
+from .lookup import confirmation_token
+from .middleware import accepted_encodings
+from .outbox import claim_batch, dispatch_batch, retry_delay
+from .pricing import reprice
+from .storage import compress_variants
+from .standings import CACHE_KEY, group_tables, rebuild_standings
+from .waitlist import OfferUnavailable, SoldOut, allocate, claim_offer, expire_offers, join, take_seats
+from .models import ArchivedBooking, Booking, IdempotencyKey, Match, OutboxMessage, Standing, Team, Ticket, TicketCategory, TicketPrice, Venue, WaitlistEntry
+
+
+def make_match(home_code='KEN', away_code='UGA', **kwargs):
+    home, _ = Team.objects.get_or_create(code=home_code, defaults={'name': f'Team {home_code}'})
+    away, _ = Team.objects.get_or_create(code=away_code, defaults={'name': f'Team {away_code}'})
+    venue, _ = Venue.objects.get_or_create(name='Kasarani', defaults={'city': 'Nairobi', 'country': 'Kenya', 'capacity': 60000})
+    kwargs.setdefault('date_time', timezone.now() + timedelta(days=7))
+    kwargs.setdefault('group', 'A')
+    return Match.objects.create(home_team=home, away_team=away, venue=venue, **kwargs)
+
+
+def make_price(match=None, available_quantity=100):
+    category, _ = TicketCategory.objects.get_or_create(name='Regular', defaults={'description': 'Standard seating'})
+    return TicketPrice.objects.create(
+        match=match or make_match(),
+        category=category,
+        price_kes=Decimal('500'),
+        price_ugx=Decimal('7500'),
+        price_tzs=Decimal('12500'),
+        available_quantity=available_quantity,
+    )
+
+
+def booking_form_data(ticket_price, quantity=2, **kwargs):
+    data = {
+        'ticket_price': ticket_price.id,
+        'quantity': quantity,
+        'currency': 'KES',
+        'payment_method': 'mpesa_ke',
+        'customer_name': 'Jane Wanjiru',
+        'customer_email': 'jane@example.com',
+        'customer_phone': '0712345678',
+    }
+    data.update(kwargs)
+    return data
+
+
+def make_booking(ticket_price, quantity=2, **kwargs):
+    kwargs.setdefault('customer_email', 'jane@example.com')
+    kwargs.setdefault('customer_phone', '+254712345678')
+    booking = Booking(
+        ticket_price=ticket_price,
+        quantity=quantity,
+        total_amount=ticket_price.price_kes * quantity,
+        currency='KES',
+        payment_method='mpesa_ke',
+        customer_name='Jane Wanjiru',
+        **kwargs,
+    )
+    booking.save()
+    tickets = [Ticket.objects.create(booking=booking) for i in range(quantity)]
+    return booking, tickets
+
+
+class StaticFilesTests(TestCase):
+    def test_pages_render_without_collectstatic(self):
+        # The test runner sets DEBUG=False and there is no manifest
+        make_price()
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '/static/tickets/css/base.css')
+
+
+@override_settings(DEBUG=False)
+class PrecompressedStaticTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        static_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, static_root)
+        cls.enterClassContext(override_settings(STATIC_ROOT=static_root))
+        call_command('collectstatic', interactive=False, verbosity=0)
+        cls.hashed_name = staticfiles_storage.stored_name('tickets/css/base.css')
+        with staticfiles_storage.open('tickets/css/base.css') as f:
+            cls.original = f.read()
+
+    def get(self, name, accept_encoding=None):
+        headers = {'HTTP_ACCEPT_ENCODING': accept_encoding} if accept_encoding is not None else {}
+        response = self.client.get('/static/' + name, **headers)
+        body = b''.join(response.streaming_content)
+        response.close()
+        return response, body
+
+    def test_collectstatic_fingerprints_and_compresses(self):
+        self.assertNotEqual(self.hashed_name, 'tickets/css/base.css')
+        self.assertTrue(staticfiles_storage.exists(self.hashed_name + '.gz'))
+        self.assertTrue(staticfiles_storage.exists(self.hashed_name + '.br'))
+
+    def test_serves_best_accepted_variant(self):
+        response, body = self.get(self.hashed_name, 'gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertLess(len(body), len(self.original))
+
+        response, body = self.get(self.hashed_name, 'br;q=0, gzip;q=0.8')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body), self.original)
+
+        response, body = self.get(self.hashed_name, 'identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(body, self.original)
+
+    def test_immutable_caching_only_for_fingerprinted_names(self):
+        response, _ = self.get(self.hashed_name, 'gzip')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        # Unhashed copies are served as collected, without pre-built variants
+        response, body = self.get('tickets/css/base.css', 'gzip')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(body, self.original)
+
+    def test_pages_link_fingerprinted_names(self):
+        make_price()
+        self.assertContains(self.client.get(reverse('home')), '/static/' + self.hashed_name)
+
+    def test_compress_variants_drops_variants_that_do_not_shrink(self):
+        self.assertEqual(compress_variants(b'a{}'), {})
+        variants = compress_variants(self.original)
+        self.assertEqual(set(variants), {'.gz', '.br'})
+        self.assertEqual(gzip.decompress(variants['.gz']), self.original)
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings('gzip, br;q=0'), {'gzip': 1.0, 'br': 0.0})
+        self.assertEqual(accepted_encodings('BR; q=0.5, *;q=0.1, x;q=bad'), {'br': 0.5, '*': 0.1, 'x': 0.0})
+        self.assertEqual(accepted_encodings(''), {})
+
+
+class ArchiveTests(TestCase):
+    def test_archived_booking_restores_from_compact_payload(self):
+        price = make_price()
+        booking, tickets = make_booking(price)
+        Match.objects.filter(id=price.match_id).update(is_completed=True)
+
+        self.assertEqual(archive_batch(100), (1, 2))
+        self.assertFalse(Booking.objects.exists())
+        archived = ArchivedBooking.objects.get()
+        self.assertLess(len(archived.payload), 150)
+
+        restored, restored_tickets = load_booking(booking.id)
+        self.assertEqual(restored.booking_reference, booking.booking_reference)
+        self.assertEqual(restored.customer_email, booking.customer_email)
+        self.assertEqual(restored.total_amount, booking.total_amount)
+        self.assertEqual(restored.created_at, booking.created_at)
+        self.assertEqual(restored.phone_key, booking.phone_key)
+        self.assertEqual([t.ticket_number for t in restored_tickets], [t.ticket_number for t in tickets])
+        self.assertTrue(all(t.booking_id == booking.id for t in restored_tickets))
+
+
+class PriceSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.price = make_price(available_quantity=2)
+
+    def snapshot(self):
+        response = self.client.post(
+            reverse('get_ticket_prices'),
+            json.dumps({'match_id': self.price.match_id, 'currency': 'KES'}),
+            content_type='application/json',
+        )
+        return response.json()['prices'][0]
+
+    def test_sale_invalidates_cached_availability(self):
+        self.assertEqual(self.snapshot()['available_quantity'], 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('book_ticket', args=[self.price.match_id]), booking_form_data(self.price))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.snapshot()['available_quantity'], 0)
+
+    def test_admin_price_edit_survives_repricing(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+        reprice()  # pins the current prices as the base
+        self.price.refresh_from_db()
+        response = self.client.post(reverse('admin:tickets_ticketprice_change', args=[self.price.id]), {
+            'match': self.price.match_id, 'category': self.price.category_id,
+            'price_ugx': '9000', 'price_kes': '600', 'price_tzs': '15000', 'available_quantity': 2,
+            'base_price_ugx': self.price.base_price_ugx, 'base_price_kes': self.price.base_price_kes,
+            'base_price_tzs': self.price.base_price_tzs,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.price.refresh_from_db()
+        self.assertEqual(self.price.base_price_kes, Decimal('600'))
+
+        # No sales: the lowest tier (0.90) applies to the new base, not the old one
+        reprice()
+        self.price.refresh_from_db()
+        self.assertEqual(self.price.price_kes, Decimal('540'))
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    SMS_BACKEND='tickets.sms.LocmemBackend',
+    OUTBOX_RETRY_BACKOFF_SECONDS=30,
+    OUTBOX_RETRY_BACKOFF_MAX_SECONDS=3600,
+    OUTBOX_MAX_ATTEMPTS=3,
+    OUTBOX_LEASE_SECONDS=300,
+)
+class OutboxTests(TestCase):
+    def setUp(self):
+        sms.outbox.clear()
+        self.price = make_price()
+
+    def book(self, **kwargs):
+        return self.client.post(reverse('book_ticket', args=[self.price.match_id]), booking_form_data(self.price, **kwargs))
+
+    def book_email_only(self):
+        self.book()
+        OutboxMessage.objects.filter(channel='sms').delete()
+
+    def make_due(self):
+        OutboxMessage.objects.update(next_attempt_at=timezone.now())
+
+    def test_booking_queues_and_dispatch_delivers(self):
+        self.book()
+        self.assertEqual(OutboxMessage.objects.filter(status='pending').count(), 2)
+
+        self.assertEqual(dispatch_batch(), (2, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(Booking.objects.get().booking_reference, mail.outbox[0].body)
+        self.assertEqual([recipient for recipient, body in sms.outbox], ['0712345678'])
+        self.assertFalse(OutboxMessage.objects.exclude(status='sent').exists())
+
+    def test_outbox_rows_roll_back_with_failed_booking(self):
+        with mock.patch.object(IdempotencyKey.objects, 'create', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                self.book(idempotency_key='6f1c1b36-1d2f-4a8e-9a43-0c0f9a8c2a11')
+        self.assertFalse(Booking.objects.exists())
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.price.refresh_from_db()
+        self.assertEqual(self.price.available_quantity, 100)
+
+    def test_failed_send_is_retried_with_backoff(self):
+        self.book_email_only()
+        with mock.patch('tickets.outbox.EmailMessage.send', side_effect=OSError('connection refused')):
+            before = timezone.now()
+            self.assertEqual(dispatch_batch(), (0, 1))
+            message = OutboxMessage.objects.get()
+            self.assertEqual((message.status, message.attempts), ('pending', 1))
+            self.assertEqual(message.last_error, 'connection refused')
+            self.assertGreaterEqual(message.next_attempt_at, before + timedelta(seconds=30))
+            self.assertLess(message.next_attempt_at, before + timedelta(seconds=60))
+
+            # Not due yet
+            self.assertEqual(dispatch_batch(), (0, 0))
+
+            self.make_due()
+            before = timezone.now()
+            dispatch_batch()
+            message.refresh_from_db()
+            self.assertEqual(message.attempts, 2)
+            self.assertGreaterEqual(message.next_attempt_at, before + timedelta(seconds=60))
+
+        self.make_due()
+        self.assertEqual(dispatch_batch(), (1, 0))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts, message.last_error), ('sent', 3, ''))
+        self.assertEqual(retry_delay(20), timedelta(seconds=3600))
+
+    def test_message_fails_after_max_attempts(self):
+        self.book_email_only()
+        with mock.patch('tickets.outbox.EmailMessage.send', side_effect=OSError('mailbox unavailable')):
+            for attempt in range(3):
+                self.make_due()
+                self.assertEqual(dispatch_batch(), (0, 1))
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('failed', 3))
+
+        self.make_due()
+        self.assertEqual(dispatch_batch(), (0, 0))
+        self.assertEqual(mail.outbox, [])
+
+    def test_claimed_batch_is_leased_until_expiry(self):
+        self.book()
+        self.assertEqual(len(claim_batch(10)), 2)
+        # A second dispatcher skips leased messages
+        self.assertEqual(claim_batch(10), [])
+
+        # A dispatcher that died mid-batch: the lease runs out and the messages are claimed again
+        later = timezone.now() + timedelta(seconds=301)
+        with mock.patch('tickets.outbox.timezone.now', return_value=later):
+            self.assertEqual(len(claim_batch(10)), 2)
+
+
+class APITests(TestCase):
+    def setUp(self):
+        start = timezone.now() + timedelta(days=7)
+        self.matches = [
+            make_match('KEN', 'UGA', date_time=start),
+            make_match('TAN', 'RWA', date_time=start + timedelta(hours=3)),
+            make_match('KEN', 'TAN', date_time=start + timedelta(days=1)),
+        ]
+        make_price(self.matches[0])
+
+    def get(self, name, **params):
+        return self.client.get(reverse(name), params)
+
+    def test_sparse_fields(self):
+        response = self.get('api_match_list', fields='id,home_score')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data'][0], {'id': self.matches[0].id, 'home_score': None})
+
+        response = self.get('api_team_list', fields='code')
+        self.assertEqual([team['code'] for team in response.json()['data']], ['KEN', 'UGA', 'TAN', 'RWA'])
+
+        response = self.get('api_match_list', fields='id,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Unknown match field(s): secret'})
+
+    def test_expand(self):
+        response = self.get(
+            'api_match_list', fields='id,home_team,venue', expand='home_team,prices', **{'fields[team]': 'code'}
+        )
+        first = response.json()['data'][0]
+        self.assertEqual(first['home_team'], {'code': 'KEN'})
+        self.assertEqual(first['venue'], self.matches[0].venue_id)
+        self.assertEqual(len(first['prices']), 1)
+        self.assertEqual(first['prices'][0]['price_kes'], '500.00')
+        self.assertEqual(response.json()['data'][1]['prices'], [])
+
+        self.assertEqual(self.get('api_match_list', expand='referee').status_code, 400)
+
+    def test_cursor_pagination(self):
+        seen = []
+        params = {'limit': 2, 'fields': 'id'}
+        while True:
+            body = self.get('api_match_list', **params).json()
+            seen.extend(match['id'] for match in body['data'])
+            if body['next_cursor'] is None:
+                break
+            params['cursor'] = body['next_cursor']
+        self.assertEqual(seen, [match.id for match in self.matches])
+
+        body = self.get('api_team_list', limit=3).json()
+        rest = self.get('api_team_list', limit=3, cursor=body['next_cursor']).json()
+        self.assertEqual(len(body['data']) + len(rest['data']), 4)
+        self.assertIsNone(rest['next_cursor'])
+
+    def test_tampered_cursor_is_rejected(self):
+        for name, values in [
+            ('api_match_list', [1, 2]),
+            ('api_match_list', ['2024-13-45T00:00:00', 2]),
+            ('api_match_list', [None, 2]),
+            ('api_match_list', ['2024-01-01T00:00:00+00:00', '2']),
+            ('api_match_list', ['2024-01-01T00:00:00+00:00']),
+            ('api_team_list', ['abc']),
+            ('api_team_list', [{'a': 1}]),
+            ('api_team_list', [True]),
+            ('api_team_list', {'id': 1}),
+        ]:
+            with self.subTest(name=name, values=values):
+                response = self.get(name, cursor=api._encode_cursor(values))
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': 'Invalid cursor'})
+        self.assertEqual(self.get('api_team_list', cursor='not base64!').status_code, 400)
+
+    def test_etag(self):
+        response = self.get('api_venue_list')
+        etag = response['ETag']
+        response = self.client.get(reverse('api_venue_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Venue.objects.update(capacity=50000)
+        response = self.client.get(reverse('api_venue_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class StandingsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.match = make_match('KEN', 'UGA')
+
+    def table(self, group='A'):
+        return {
+            row['team__code']: (row['played'], row['won'], row['drawn'], row['lost'], row['goal_difference'], row['points'])
+            for row in group_tables().get(group, [])
+        }
+
+    def record(self, match, home_score, away_score, **kwargs):
+        match.home_score = home_score
+        match.away_score = away_score
+        match.is_completed = True
+        for field, value in kwargs.items():
+            setattr(match, field, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            match.save()
+
+    def assertMatchesRebuild(self):
+        tables = self.table('A'), self.table('B')
+        rebuild_standings()
+        self.assertEqual((self.table('A'), self.table('B')), tables)
+
+    def test_fixture_adds_teams_before_they_play(self):
+        self.assertEqual(self.table(), {'KEN': (0, 0, 0, 0, 0, 0), 'UGA': (0, 0, 0, 0, 0, 0)})
+
+    def test_result_entry(self):
+        self.table()
+        self.record(self.match, 2, 1)
+        self.assertEqual(self.table(), {'KEN': (1, 1, 0, 0, 1, 3), 'UGA': (1, 0, 0, 1, -1, 0)})
+        self.assertMatchesRebuild()
+
+    def test_result_correction(self):
+        self.record(self.match, 2, 1)
+        self.record(self.match, 1, 1)
+        self.assertEqual(self.table(), {'KEN': (1, 0, 1, 0, 0, 1), 'UGA': (1, 0, 1, 0, 0, 1)})
+        self.assertMatchesRebuild()
+
+    def test_group_change(self):
+        self.record(self.match, 0, 3)
+        self.record(self.match, 0, 3, group='B')
+        self.assertEqual(self.table('A'), {})
+        self.assertEqual(self.table('B'), {'KEN': (1, 0, 0, 1, -3, 0), 'UGA': (1, 1, 0, 0, 3, 3)})
+        self.assertMatchesRebuild()
+
+    def test_group_change_keeps_teams_with_other_fixtures(self):
+        make_match('KEN', 'TAN')
+        self.record(self.match, 2, 0, group='B')
+        self.assertEqual(self.table('A'), {'KEN': (0, 0, 0, 0, 0, 0), 'TAN': (0, 0, 0, 0, 0, 0)})
+        self.assertMatchesRebuild()
+
+    def test_unchanged_result_skips_standings(self):
+        self.record(self.match, 1, 0)
+        self.match.date_time += timedelta(hours=1)
+        with self.assertNumQueries(4):
+            # SAVEPOINT, SELECT ... FOR UPDATE, UPDATE, RELEASE SAVEPOINT
+            self.match.save()
+
+    def test_deleting_a_scored_match(self):
+        other = make_match('KEN', 'TAN')
+        self.record(self.match, 2, 1)
+        self.record(other, 1, 0)
+        self.table()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.match.delete()
+        self.assertIsNone(cache.get(CACHE_KEY))
+        # UGA has no fixture left in the group
+        self.assertEqual(self.table(), {'KEN': (1, 1, 0, 0, 1, 3), 'TAN': (1, 0, 0, 1, -1, 0)})
+        self.assertMatchesRebuild()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Match.objects.all().delete()
+        self.assertEqual(self.table(), {})
+
+    def test_deleting_a_team(self):
+        self.record(self.match, 2, 1)
+        make_match('TAN', 'UGA')
+        with self.captureOnCommitCallbacks(execute=True):
+            Team.objects.get(code='KEN').delete()
+        self.assertEqual(self.table(), {'TAN': (0, 0, 0, 0, 0, 0), 'UGA': (0, 0, 0, 0, 0, 0)})
+        self.assertFalse(Standing.objects.filter(team__code='KEN').exists())
+
+
+class WaitlistTests(TestCase):
+    def setUp(self):
+        self.price = make_price(available_quantity=0)
+        self.booking, _ = make_booking(self.price, quantity=4)
+
+    def seats(self):
+        return TicketPrice.objects.values_list('available_quantity', 'released_quantity', 'held_quantity').get(id=self.price.id)
+
+    def join(self, quantity, name='Amani Otieno'):
+        return join(self.price, name, 'amani@example.com', '0722000000', quantity)
+
+    def cancel(self, booking):
+        booking.payment_status = 'cancelled'
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.save()
+
+    def test_concurrent_take_seats_never_oversell(self):
+        TicketPrice.objects.filter(id=self.price.id).update(available_quantity=3)
+        # Both buyers loaded the price while three seats were left
+        first, second = TicketPrice.objects.get(id=self.price.id), TicketPrice.objects.get(id=self.price.id)
+        self.assertTrue(take_seats(first, 2))
+        self.assertFalse(take_seats(second, 2))
+        self.assertTrue(take_seats(second, 1))
+        self.assertEqual(self.seats(), (0, 0, 0))
+
+    @override_settings(WAITLIST_SHARE=1)
+    def test_release_offers_seats_to_waitlist_in_order(self):
+        first, too_big, small = self.join(2), self.join(3), self.join(1)
+        self.cancel(self.booking)
+        statuses = WaitlistEntry.objects.order_by('id').values_list('status', flat=True)
+        self.assertEqual(list(statuses), ['offered', 'waiting', 'offered'])
+        # The seat nobody in the queue could take goes back on sale
+        self.assertEqual(self.seats(), (1, 0, 3))
+        self.assertEqual(OutboxMessage.objects.filter(recipient='amani@example.com').count(), 2)
+
+    @override_settings(WAITLIST_SHARE=0)
+    def test_release_without_waitlist_share_goes_to_general_sale(self):
+        self.join(2)
+        self.cancel(self.booking)
+        self.assertEqual(self.seats(), (4, 0, 0))
+        self.assertFalse(WaitlistEntry.objects.exclude(status='waiting').exists())
+
+    @override_settings(WAITLIST_SHARE=1)
+    def test_expired_offers_go_to_the_next_in_line(self):
+        first, second = self.join(4), self.join(4, name='Neema Mushi')
+        self.cancel(self.booking)
+        WaitlistEntry.objects.filter(id=first.id).update(offer_expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(expire_offers(), (1, 1))
+        self.assertEqual(self.seats(), (0, 4, 0))
+        self.assertEqual(allocate(), 1)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, second.status), ('expired', 'offered'))
+        self.assertEqual(self.seats(), (0, 0, 4))
+        self.assertEqual(expire_offers(), (0, 0))
+
+    @override_settings(WAITLIST_SHARE=1)
+    def test_claim_offer(self):
+        entry = self.join(4)
+        self.cancel(self.booking)
+        entry.refresh_from_db()
+
+        booking = claim_offer(entry.token, 'UGX', 'mtn_ug')
+        self.assertEqual((booking.quantity, booking.total_amount, booking.payment_status), (4, Decimal('30000'), 'pending'))
+        self.assertEqual(booking.tickets.count(), 4)
+        self.assertEqual(self.seats(), (0, 0, 0))
+        entry.refresh_from_db()
+        self.assertEqual((entry.status, entry.booking), ('claimed', booking))
+
+        with self.assertRaises(OfferUnavailable):
+            claim_offer(entry.token, 'UGX', 'mtn_ug')
+
+    @override_settings(WAITLIST_SHARE=1)
+    def test_lapsed_offer_cannot_be_claimed(self):
+        entry = self.join(4)
+        self.cancel(self.booking)
+        WaitlistEntry.objects.filter(id=entry.id).update(offer_expires_at=timezone.now())
+        with self.assertRaises(OfferUnavailable):
+            claim_offer(entry.token, 'KES', 'mpesa_ke')
+        self.assertEqual(Booking.objects.count(), 1)
+
+    @override_settings(WAITLIST_SHARE=0)
+    def test_reactivating_a_booking_takes_its_seats_back(self):
+        self.cancel(self.booking)
+        self.assertEqual(self.seats(), (4, 0, 0))
+        self.booking.payment_status = 'completed'
+        self.booking.save()
+        self.assertEqual(self.seats(), (0, 0, 0))
+
+        self.cancel(self.booking)
+        TicketPrice.objects.filter(id=self.price.id).update(available_quantity=3)
+        self.booking.payment_status = 'pending'
+        with self.assertRaises(SoldOut):
+            self.booking.save()
+        self.booking.refresh_from_db()
+        self.assertEqual((self.booking.payment_status, self.seats()), ('cancelled', (3, 0, 0)))
+
+    @override_settings(WAITLIST_SHARE=0)
+    def test_admin_form_rejects_reactivation_when_sold_out(self):
+        self.cancel(self.booking)
+        TicketPrice.objects.filter(id=self.price.id).update(available_quantity=3)
+        data = model_to_dict(self.booking)
+        data['payment_status'] = 'completed'
+        form = BookingAdminForm(data=data, instance=self.booking)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.non_field_errors(), ['This change needs 4 more tickets but only 3 are left in this category.'])
+
+        TicketPrice.objects.filter(id=self.price.id).update(available_quantity=4)
+        form = BookingAdminForm(data=data, instance=self.booking)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        self.assertEqual(self.seats(), (0, 0, 0))
+
+    def test_admin_form_rejects_quantity_increase_when_sold_out(self):
+        data = model_to_dict(self.booking)
+        data['quantity'] = 6
+        form = BookingAdminForm(data=data, instance=self.booking)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.non_field_errors(), ['This change needs 2 more tickets but only 0 are left in this category.'])
+
+    @override_settings(WAITLIST_SHARE=0)
+    def test_concurrent_cancels_release_seats_once(self):
+        # An admin and a payment callback both loaded the booking while it was pending
+        first, second = Booking.objects.get(id=self.booking.id), Booking.objects.get(id=self.booking.id)
+        self.cancel(first)
+        second.payment_status = 'failed'
+        with self.captureOnCommitCallbacks(execute=True):
+            second.save()
+        self.assertEqual(self.seats(), (4, 0, 0))
+
+    @override_settings(WAITLIST_SHARE=0)
+    def test_quantity_and_category_changes_move_seats(self):
+        TicketPrice.objects.filter(id=self.price.id).update(available_quantity=5)
+        self.booking.quantity = 6
+        self.booking.save()
+        self.assertEqual(self.seats(), (3, 0, 0))
+
+        self.booking.quantity = 1
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.save()
+        self.assertEqual(self.seats(), (8, 0, 0))
+
+        vip = TicketPrice.objects.create(
+            match=self.price.match, category=TicketCategory.objects.create(name='VIP'),
+            price_kes=Decimal('2000'), price_ugx=Decimal('30000'), price_tzs=Decimal('50000'), available_quantity=10,
+        )
+        self.booking.ticket_price = vip
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.save()
+        self.assertEqual(self.seats(), (9, 0, 0))
+        self.assertEqual(TicketPrice.objects.get(id=vip.id).available_quantity, 9)
+
+    @override_settings(WAITLIST_SHARE=0)
+    def test_deleting_active_booking_releases_seats(self):
+        failed, _ = make_booking(self.price, quantity=3, payment_status='failed')
+        with self.captureOnCommitCallbacks(execute=True):
+            failed.delete()
+            Booking.objects.filter(id=self.booking.id).delete()
+        self.assertEqual(self.seats(), (4, 0, 0))
+
+    def test_archiving_does_not_resell_played_matches(self):
+        Match.objects.filter(id=self.price.match_id).update(is_completed=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archive_batch(100), (1, 4))
+        self.assertEqual(self.seats(), (0, 0, 0))
+
+    def test_sale_lost_to_a_concurrent_buyer_rolls_back(self):
+        TicketPrice.objects.filter(id=self.price.id).update(available_quantity=2)
+        # Another buyer takes the seats after this form was validated
+        with mock.patch('tickets.waitlist.take_seats', return_value=False):
+            response = self.client.post(reverse('book_ticket', args=[self.price.match_id]), booking_form_data(self.price))
+        self.assertContains(response, 'those tickets have just sold out')
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertFalse(Ticket.objects.exclude(booking=self.booking).exists())
+        self.assertFalse(OutboxMessage.objects.exists())
+
+
+class BookingConfirmationTests(TestCase):
+    def setUp(self):
+        self.price = make_price()
+
+    def confirmation_url(self, reference, token=None):
+        return reverse('booking_confirmation', args=[reference, token or confirmation_token(reference)])
+
+    def test_booking_redirects_to_tokenised_confirmation(self):
+        data = booking_form_data(self.price, idempotency_key='6f1c3b5e-8a0f-4e39-9f55-0a3c1e6d2b71')
+        response = self.client.post(reverse('book_ticket', args=[self.price.match_id]), data)
+        booking = Booking.objects.get()
+        url = self.confirmation_url(booking.booking_reference)
+        self.assertRedirects(response, url)
+        self.assertNotIn(f'/{booking.id}/', url)
+        self.assertContains(self.client.get(url), booking.booking_reference)
+
+        # A resubmitted form is sent to the same page
+        response = self.client.post(reverse('book_ticket', args=[self.price.match_id]), data)
+        self.assertRedirects(response, url)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_confirmation_needs_the_token(self):
+        booking, _ = make_booking(self.price)
+        other, _ = make_booking(self.price)
+        for url in [
+            f'/booking/{booking.id}/confirmation/',
+            self.confirmation_url(booking.booking_reference, '0' * 32),
+            self.confirmation_url(booking.booking_reference, confirmation_token(other.booking_reference)),
+            self.confirmation_url('NOSUCHREF'),
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_archived_booking_confirmation(self):
+        booking, _ = make_booking(self.price)
+        Match.objects.filter(id=self.price.match_id).update(is_completed=True)
+        archive_batch(100)
+        self.assertFalse(Booking.objects.exists())
+        self.assertContains(self.client.get(self.confirmation_url(booking.booking_reference)), booking.booking_reference)
+
+
+@override_settings(PERF_QUERY_BUDGET=100, PERF_LATENCY_BUDGET_MS=60000, PERF_TRACE_SAMPLE_RATE=0)
+class PerformanceMetricsTests(TestCase):
+    def setUp(self):
+        perf_metrics.registry.reset()
+        make_price()
+
+    def view_metrics(self, view_name):
+        return perf_metrics.registry._views[view_name]
+
+    def test_counts_queries_and_time_per_url_name(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('home'))
+            self.client.get(reverse('home'))
+        # The next request resets connection.queries
+        query_count = len(queries)
+        self.client.get(reverse('api_team_list'))
+
+        home = self.view_metrics('home')
+        self.assertEqual(home.count, 2)
+        self.assertEqual(home.queries, query_count)
+        self.assertGreater(home.db_time, 0)
+        self.assertGreater(home.template_time, 0)
+        self.assertEqual(home.over_budget, 0)
+        api_teams = self.view_metrics('api_team_list')
+        self.assertEqual((api_teams.count, api_teams.template_time), (1, 0))
+
+    @override_settings(PERF_QUERY_BUDGET=0)
+    def test_over_budget_requests_are_counted_and_logged(self):
+        with self.assertLogs('tickets.performance', 'WARNING') as logs:
+            self.client.get(reverse('home'))
+        self.assertEqual(self.view_metrics('home').over_budget, 1)
+        self.assertIn('GET home over budget', logs.output[0])
+
+    def test_prometheus_histogram_is_cumulative(self):
+        stats = perf_metrics.RequestStats()
+        stats.queries = 3
+        for latency in (0.003, 0.03, 0.04, 20):
+            perf_metrics.registry.observe('home', latency, stats, over_budget=latency > 1)
+        lines = perf_metrics.registry.render_prometheus().splitlines()
+        for le, count in [('0.005', 1), ('0.01', 1), ('0.025', 1), ('0.05', 3), ('10.0', 3), ('+Inf', 4)]:
+            self.assertIn(f'tickets_request_duration_seconds_bucket{{view="home",le="{le}"}} {count}', lines)
+        self.assertIn('tickets_request_duration_seconds_count{view="home"} 4', lines)
+        self.assertIn('tickets_request_duration_seconds_sum{view="home"} 20.073000', lines)
+        self.assertIn('tickets_db_queries_total{view="home"} 12', lines)
+        self.assertIn('tickets_requests_over_budget_total{view="home"} 1', lines)
+
+    @override_settings(PERF_METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_metrics_endpoint_is_restricted_by_ip(self):
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.8').status_code, 403)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '# TYPE tickets_request_duration_seconds histogram')
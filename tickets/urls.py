@@ -1,13 +1,23 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('matches/', views.matches, name='matches'),
     path('match/<int:match_id>/', views.match_detail, name='match_detail'),
     path('book/<int:match_id>/', views.book_ticket, name='book_ticket'),
-    path('booking/<int:booking_id>/confirmation/', views.booking_confirmation, name='booking_confirmation'),
+    path('booking/<str:reference>/confirmation/<str:token>/', views.booking_confirmation, name='booking_confirmation'),
+    path('booking/find/', views.find_booking, name='find_booking'),
+    path('waitlist/<int:ticket_price_id>/join/', views.waitlist_join, name='waitlist_join'),
+    path('waitlist/claim/<uuid:token>/', views.waitlist_claim, name='waitlist_claim'),
     path('api/ticket-prices/', views.get_ticket_prices, name='get_ticket_prices'),
     path('search/', views.search_matches, name='search_matches'),
+    path('standings/', views.standings, name='standings'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('api/v1/matches/', api.match_list, name='api_match_list'),
+    path('api/v1/matches/<int:match_id>/', api.match_item, name='api_match_item'),
+    path('api/v1/teams/', api.team_list, name='api_team_list'),
+    path('api/v1/venues/', api.venue_list, name='api_venue_list'),
+    path('api/v1/prices/', api.price_list, name='api_price_list'),
 ]
 
@@ -1,13 +1,25 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse, HttpResponse, HttpResponseForbidden
+from django.conf import settings
+from django.views.decorators.cache import never_cache
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib import messages
+from django.core.cache import cache
 from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 from django.utils import timezone
-from .models import Match, Team, Venue, TicketPrice, TicketCategory, Booking, Ticket
-from .forms import BookingForm
+from .models import Match, Team, Venue, TicketPrice, TicketCategory, Ticket, IdempotencyKey, WaitlistEntry
+from .forms import BookingForm, WaitlistJoinForm, WaitlistClaimForm, FindBookingForm
+from . import metrics as perf_metrics
+from .outbox import enqueue_booking_confirmation
+from .standings import group_tables
+from .pricing import price_snapshot_cache_key
+from .archive import load_booking
+from . import waitlist
+from .lookup import confirmation_token, confirmed_booking_id, find_booking_id, lookup_allowed
 import json
+import uuid
 from decimal import Decimal
 
 def home(request):
@@ -78,10 +90,30 @@ def match_detail(request, match_id):
     }
     return render(request, 'tickets/match_detail.html', context)
 
+def _replayed_booking_reference(idempotency_key):
+    """Reference of the booking already created for this idempotency key, if any"""
+    if not idempotency_key:
+        return None
+    try:
+        idempotency_key = uuid.UUID(str(idempotency_key))
+    except ValueError:
+        return None
+    return IdempotencyKey.objects.filter(key=idempotency_key).values_list('booking__booking_reference', flat=True).first()
+
+def _confirmation_redirect(reference):
+    return redirect('booking_confirmation', reference=reference, token=confirmation_token(reference))
+
 def book_ticket(request, match_id):
     """Ticket booking page"""
+    if request.method == 'POST':
+        # A resubmitted form gets the original booking back without redoing any work
+        replayed_reference = _replayed_booking_reference(request.POST.get('idempotency_key'))
+        if replayed_reference:
+            return _confirmation_redirect(replayed_reference)
+    
     match = get_object_or_404(Match, id=match_id)
     ticket_prices = TicketPrice.objects.filter(match=match).select_related('category')
+    waitlist_price = None
     
     if request.method == 'POST':
         form = BookingForm(request.POST)
@@ -98,14 +130,42 @@ def book_ticket(request, match_id):
                 unit_price = ticket_price.price_tzs
             
             booking.total_amount = unit_price * booking.quantity
-            booking.save()
-            
-            # Create individual tickets
-            for i in range(booking.quantity):
-                Ticket.objects.create(booking=booking)
+            idempotency_key = form.cleaned_data.get('idempotency_key')
             
-            messages.success(request, f'Booking created successfully! Reference: {booking.booking_reference}')
-            return redirect('booking_confirmation', booking_id=booking.id)
+            # The outbox rows commit together with the booking; dispatch_outbox sends them
+            try:
+                with transaction.atomic():
+                    booking.save()
+                    
+                    # Create individual tickets
+                    tickets = Ticket.objects.bulk_create([
+                        Ticket(booking=booking, ticket_number=Ticket.new_ticket_number()) for i in range(booking.quantity)
+                    ])
+                    enqueue_booking_confirmation(booking, tickets)
+                    
+                    if idempotency_key:
+                        IdempotencyKey.objects.create(key=idempotency_key, booking=booking)
+                    
+                    # Conditional decrement, last so the hot price row is locked only
+                    # until commit: concurrent buyers cannot both get the last seats,
+                    # and SoldOut rolls the booking back
+                    if not waitlist.take_seats(ticket_price, booking.quantity):
+                        raise waitlist.SoldOut()
+            except IntegrityError:
+                # A concurrent retry with the same key committed first
+                replayed_reference = _replayed_booking_reference(idempotency_key)
+                if not replayed_reference:
+                    raise
+                return _confirmation_redirect(replayed_reference)
+            except waitlist.SoldOut:
+                waitlist_price = ticket_price
+                messages.warning(request, 'Sorry, those tickets have just sold out.')
+            else:
+                messages.success(request, f'Booking created successfully! Reference: {booking.booking_reference}')
+                return _confirmation_redirect(booking.booking_reference)
+        elif 'quantity' in form.errors:
+            # Not enough seats left; offer the waitlist for that category
+            waitlist_price = form.cleaned_data.get('ticket_price')
     else:
         form = BookingForm()
     
@@ -113,13 +173,72 @@ def book_ticket(request, match_id):
         'match': match,
         'ticket_prices': ticket_prices,
         'form': form,
+        'waitlist_price': waitlist_price,
     }
     return render(request, 'tickets/book_ticket.html', context)
 
-def booking_confirmation(request, booking_id):
-    """Booking confirmation page"""
-    booking = get_object_or_404(Booking, id=booking_id)
-    tickets = Ticket.objects.filter(booking=booking)
+def waitlist_join(request, ticket_price_id):
+    """Join the waitlist for a sold-out ticket category"""
+    ticket_price = get_object_or_404(
+        TicketPrice.objects.select_related('category', 'match__home_team', 'match__away_team', 'match__venue'),
+        id=ticket_price_id,
+    )
+    
+    if request.method == 'POST':
+        form = WaitlistJoinForm(request.POST)
+        if form.is_valid():
+            waitlist.join(ticket_price, **form.cleaned_data)
+            messages.success(request, "You're on the waitlist. We'll email and text you if seats become available.")
+            return redirect('match_detail', match_id=ticket_price.match_id)
+    else:
+        form = WaitlistJoinForm()
+    
+    context = {
+        'ticket_price': ticket_price,
+        'match': ticket_price.match,
+        'form': form,
+    }
+    return render(request, 'tickets/waitlist_join.html', context)
+
+def waitlist_claim(request, token):
+    """Claim the seats held by a waitlist offer"""
+    entry = get_object_or_404(
+        WaitlistEntry.objects.select_related(
+            'ticket_price__category', 'ticket_price__match__home_team', 'ticket_price__match__away_team',
+            'ticket_price__match__venue',
+        ),
+        token=token,
+    )
+    
+    if request.method == 'POST':
+        form = WaitlistClaimForm(request.POST)
+        if form.is_valid():
+            try:
+                booking = waitlist.claim_offer(token, form.cleaned_data['currency'], form.cleaned_data['payment_method'])
+            except waitlist.OfferUnavailable as error:
+                messages.error(request, str(error))
+                return redirect('waitlist_claim', token=token)
+            messages.success(request, f'Booking created successfully! Reference: {booking.booking_reference}')
+            return _confirmation_redirect(booking.booking_reference)
+    else:
+        form = WaitlistClaimForm()
+    
+    context = {
+        'entry': entry,
+        'ticket_price': entry.ticket_price,
+        'match': entry.ticket_price.match,
+        'is_open': entry.status == 'offered' and entry.offer_expires_at > timezone.now(),
+        'form': form,
+    }
+    return render(request, 'tickets/waitlist_claim.html', context)
+
+@never_cache
+def booking_confirmation(request, reference, token):
+    """Booking confirmation page, reached through the tokenised link from booking"""
+    booking_id = confirmed_booking_id(reference, token)
+    booking, tickets = load_booking(booking_id) if booking_id else (None, None)
+    if booking is None:
+        raise Http404('No booking matches the given query.')
     
     context = {
         'booking': booking,
@@ -127,6 +246,33 @@ def booking_confirmation(request, booking_id):
     }
     return render(request, 'tickets/booking_confirmation.html', context)
 
+@never_cache
+def find_booking(request):
+    """Look up a booking by reference plus email or phone, without exposing its ID"""
+    status = 200
+    if request.method == 'POST':
+        form = FindBookingForm(request.POST)
+        if not lookup_allowed(request.META.get('REMOTE_ADDR')):
+            form.is_valid()
+            form.add_error(None, 'Too many attempts. Please try again in a few minutes.')
+            status = 429
+        elif form.is_valid():
+            booking_id = find_booking_id(form.cleaned_data['reference'], form.cleaned_data['contact'])
+            booking, tickets = load_booking(booking_id) if booking_id else (None, None)
+            if booking is not None:
+                context = {
+                    'booking': booking,
+                    'tickets': tickets,
+                    'found_by_lookup': True,
+                }
+                return render(request, 'tickets/booking_confirmation.html', context)
+            # Same message whichever detail is wrong
+            form.add_error(None, 'No booking matches those details.')
+    else:
+        form = FindBookingForm()
+    
+    return render(request, 'tickets/find_booking.html', {'form': form}, status=status)
+
 @csrf_exempt
 def get_ticket_prices(request):
     """AJAX endpoint to get ticket prices for a match"""
@@ -135,6 +281,12 @@ def get_ticket_prices(request):
         match_id = data.get('match_id')
         currency = data.get('currency', 'KES')
         
+        # Snapshots are dropped by the pricing engine when prices change
+        cache_key = price_snapshot_cache_key(match_id, currency) if currency in ('UGX', 'KES', 'TZS') else None
+        prices_data = cache.get(cache_key) if cache_key else None
+        if prices_data is not None:
+            return JsonResponse({'success': True, 'prices': prices_data})
+        
         try:
             match = Match.objects.get(id=match_id)
             ticket_prices = TicketPrice.objects.filter(match=match).select_related('category')
@@ -157,6 +309,8 @@ def get_ticket_prices(request):
                     'currency': currency
                 })
             
+            if cache_key:
+                cache.set(cache_key, prices_data, getattr(settings, 'PRICE_SNAPSHOT_CACHE_SECONDS', 60))
             return JsonResponse({'success': True, 'prices': prices_data})
         except Match.DoesNotExist:
             return JsonResponse({'success': False, 'error': 'Match not found'})
@@ -191,3 +345,20 @@ def search_matches(request):
         'query': query,
     }
     return render(request, 'tickets/search_results.html', context)
+
+def standings(request):
+    """Group standings tables"""
+    context = {
+        'groups': sorted(group_tables().items()),
+    }
+    return render(request, 'tickets/standings.html', context)
+
+def metrics(request):
+    """Prometheus endpoint exposing the per-view performance aggregates"""
+    allowed_ips = getattr(settings, 'PERF_METRICS_ALLOWED_IPS', None)
+    if allowed_ips and request.META.get('REMOTE_ADDR') not in allowed_ips:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        perf_metrics.registry.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
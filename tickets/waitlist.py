@@ -0,0 +1,243 @@
+"""
+Per-category waitlist for sold-out tickets.
+
+TicketPrice.available_quantity is what general sale can take; book_ticket
+takes seats with one conditional UPDATE, so concurrent buyers can never
+oversell. Seats freed by a cancelled or failed booking do not go straight
+back on sale: they collect in released_quantity until allocate() runs (on
+commit of the release, and from manage.py allocate_waitlist). Each run
+locks the price row and splits the released seats: up to WAITLIST_SHARE of
+them are offered to waiting entries in FIFO order (moved to held_quantity
+for WAITLIST_CLAIM_MINUTES), the rest return to general sale. Unclaimed
+offers expire back into the released pool for the next run.
+
+Booking.save() hands its previous status, price row and quantity to
+booking_changed(), and deleting an active booking releases its seats.
+"""
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Booking, Ticket, TicketPrice, WaitlistEntry
+from .outbox import enqueue_booking_confirmation, enqueue_waitlist_offers
+from .pricing import invalidate_price_snapshots
+
+# Booking statuses that hold seats
+ACTIVE_STATUSES = ('pending', 'completed')
+
+# Booking fields that decide which seats it holds
+SEAT_FIELDS = ('payment_status', 'ticket_price_id', 'quantity')
+
+
+class SoldOut(Exception):
+    pass
+
+
+class OfferUnavailable(Exception):
+    pass
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def take_seats(ticket_price, quantity):
+    """Take seats from general sale; False if fewer than ``quantity`` are left"""
+    taken = TicketPrice.objects.filter(id=ticket_price.id, available_quantity__gte=quantity).update(
+        available_quantity=F('available_quantity') - quantity
+    ) == 1
+    if taken:
+        # Cached price lists show availability
+        match_id = ticket_price.match_id
+        transaction.on_commit(lambda: invalidate_price_snapshots([match_id]))
+    return taken
+
+
+def release_seats(ticket_price_id, quantity):
+    """Hand seats back for the allocator; call inside the transaction that frees them"""
+    # Seats of a match that has been played are not resold (archiving deletes its bookings)
+    released = TicketPrice.objects.filter(id=ticket_price_id, match__is_completed=False).update(
+        released_quantity=F('released_quantity') + quantity
+    )
+    if released:
+        transaction.on_commit(lambda: allocate([ticket_price_id]))
+
+
+def seat_changes(previous, current):
+    """
+    Seats to release from the previous price row and to take from the current
+    one when a booking goes from ``previous`` to ``current`` (dicts of
+    SEAT_FIELDS). Returns (released, taken).
+    """
+    was_active = previous['payment_status'] in ACTIVE_STATUSES
+    is_active = current['payment_status'] in ACTIVE_STATUSES
+    if was_active and is_active and previous['ticket_price_id'] == current['ticket_price_id']:
+        change = current['quantity'] - previous['quantity']
+        return max(-change, 0), max(change, 0)
+    return (previous['quantity'] if was_active else 0), (current['quantity'] if is_active else 0)
+
+
+def booking_changed(booking, previous):
+    """Called by Booking.save() inside its transaction, with the locked row's previous SEAT_FIELDS"""
+    released, taken = seat_changes(previous, {field: getattr(booking, field) for field in SEAT_FIELDS})
+    if released:
+        release_seats(previous['ticket_price_id'], released)
+    if taken and not take_seats(booking.ticket_price, taken):
+        raise SoldOut(f'Not enough seats left for booking {booking.booking_reference}.')
+
+
+@receiver(post_delete, sender=Booking, dispatch_uid='tickets.waitlist.booking_deleted')
+def booking_deleted(sender, instance, **kwargs):
+    # Deletes (admin actions, querysets, cascades) bypass Booking.save()
+    if instance.payment_status in ACTIVE_STATUSES:
+        release_seats(instance.ticket_price_id, instance.quantity)
+
+
+def join(ticket_price, customer_name, customer_email, customer_phone, quantity):
+    """Add a customer to the back of the queue (a single INSERT)"""
+    return WaitlistEntry.objects.create(
+        ticket_price=ticket_price,
+        customer_name=customer_name,
+        customer_email=customer_email,
+        customer_phone=customer_phone,
+        quantity=quantity,
+    )
+
+
+def _waitlist_quota(released, share):
+    # Randomised rounding keeps the long-run split at ``share`` even when
+    # seats are released one at a time
+    return min(released, int(released * share + random.random()))
+
+
+def _allocate_price(ticket_price_id, now):
+    share = _setting('WAITLIST_SHARE', 0.5)
+    window = timedelta(minutes=_setting('WAITLIST_CLAIM_MINUTES', 30))
+    batch_size = _setting('WAITLIST_BATCH_SIZE', 100)
+    with transaction.atomic():
+        price = (
+            TicketPrice.objects.select_for_update()
+            .filter(id=ticket_price_id, released_quantity__gt=0)
+            .values('released_quantity', 'match_id')
+            .first()
+        )
+        if price is None:
+            return 0
+        released = price['released_quantity']
+        quota = _waitlist_quota(released, share)
+
+        offered = []
+        if quota:
+            # FIFO; an entry larger than what is left waits for a later batch
+            # without blocking smaller requests behind it
+            waiting = (
+                WaitlistEntry.objects.filter(ticket_price_id=ticket_price_id, status='waiting', quantity__lte=quota)
+                .order_by('id')[:batch_size]
+            )
+            for entry in waiting:
+                if entry.quantity <= quota:
+                    offered.append(entry)
+                    quota -= entry.quantity
+                    if not quota:
+                        break
+        held = sum(entry.quantity for entry in offered)
+
+        if offered:
+            ticket_price = TicketPrice.objects.select_related(
+                'category', 'match__home_team', 'match__away_team', 'match__venue'
+            ).get(id=ticket_price_id)
+            for entry in offered:
+                entry.ticket_price = ticket_price
+                entry.status = 'offered'
+                entry.offered_at = now
+                entry.offer_expires_at = now + window
+            WaitlistEntry.objects.filter(id__in=[entry.id for entry in offered]).update(
+                status='offered', offered_at=now, offer_expires_at=now + window
+            )
+            enqueue_waitlist_offers(offered)
+        TicketPrice.objects.filter(id=ticket_price_id).update(
+            released_quantity=F('released_quantity') - released,
+            held_quantity=F('held_quantity') + held,
+            available_quantity=F('available_quantity') + (released - held),
+        )
+        match_id = price['match_id']
+        transaction.on_commit(lambda: invalidate_price_snapshots([match_id]))
+    return len(offered)
+
+
+def allocate(ticket_price_ids=None):
+    """Distribute released seats of the given (default: all) price rows. Returns offers made."""
+    prices = TicketPrice.objects.filter(released_quantity__gt=0)
+    if ticket_price_ids is not None:
+        prices = prices.filter(id__in=ticket_price_ids)
+    now = timezone.now()
+    return sum(_allocate_price(ticket_price_id, now) for ticket_price_id in prices.values_list('id', flat=True))
+
+
+def expire_offers():
+    """Return the seats of lapsed offers to the released pool. Returns (entries, price rows)."""
+    now = timezone.now()
+    with transaction.atomic():
+        # Offers being claimed right now are locked and left alone
+        lapsed = list(
+            WaitlistEntry.objects.select_for_update(skip_locked=True)
+            .filter(status='offered', offer_expires_at__lte=now)
+            .values_list('id', flat=True)
+        )
+        if not lapsed:
+            return 0, 0
+        seats = (
+            WaitlistEntry.objects.filter(id__in=lapsed)
+            .values('ticket_price_id')
+            .annotate(seats=Sum('quantity'))
+            .values_list('ticket_price_id', 'seats')
+        )
+        for ticket_price_id, quantity in seats:
+            TicketPrice.objects.filter(id=ticket_price_id).update(
+                held_quantity=F('held_quantity') - quantity,
+                released_quantity=F('released_quantity') + quantity,
+            )
+        WaitlistEntry.objects.filter(id__in=lapsed).update(status='expired')
+    return len(lapsed), len(seats)
+
+
+def claim_offer(token, currency, payment_method):
+    """Turn an open offer into a booking for the held seats. Raises OfferUnavailable."""
+    with transaction.atomic():
+        entry = (
+            WaitlistEntry.objects.select_for_update()
+            .select_related('ticket_price__match')
+            .filter(token=token)
+            .first()
+        )
+        if entry is None or entry.status != 'offered' or entry.offer_expires_at <= timezone.now():
+            raise OfferUnavailable('This offer is no longer available.')
+
+        ticket_price = entry.ticket_price
+        booking = Booking(
+            ticket_price=ticket_price,
+            quantity=entry.quantity,
+            total_amount=getattr(ticket_price, f'price_{currency.lower()}') * entry.quantity,
+            currency=currency,
+            payment_method=payment_method,
+            customer_name=entry.customer_name,
+            customer_email=entry.customer_email,
+            customer_phone=entry.customer_phone,
+        )
+        booking.save()
+        tickets = Ticket.objects.bulk_create([
+            Ticket(booking=booking, ticket_number=Ticket.new_ticket_number()) for i in range(booking.quantity)
+        ])
+        enqueue_booking_confirmation(booking, tickets)
+
+        TicketPrice.objects.filter(id=ticket_price.id).update(held_quantity=F('held_quantity') - entry.quantity)
+        entry.status = 'claimed'
+        entry.booking = booking
+        entry.save(update_fields=['status', 'booking'])
+    return booking